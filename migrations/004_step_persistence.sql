@@ -0,0 +1,29 @@
+-- Migration: 004_step_persistence.sql
+-- Description: Persist a completed workflow step in a single call
+-- Purpose: Upsert the checkpoint, log the step event and bump the heartbeat
+--          in one transaction instead of three PostgREST round trips
+
+CREATE OR REPLACE FUNCTION persist_workflow_step(
+    p_ticket_id UUID,
+    p_worker_id TEXT,
+    p_state JSONB,
+    p_current_step TEXT,
+    p_step_name TEXT,
+    p_payload JSONB
+) RETURNS VOID AS $$
+BEGIN
+    INSERT INTO workflow_checkpoints (ticket_id, state, current_step, updated_at)
+    VALUES (p_ticket_id, p_state, p_current_step, NOW())
+    ON CONFLICT (ticket_id) DO UPDATE
+        SET state = EXCLUDED.state,
+            current_step = EXCLUDED.current_step,
+            updated_at = EXCLUDED.updated_at;
+
+    INSERT INTO ticket_events (ticket_id, event_type, step_name, payload)
+    VALUES (p_ticket_id, 'step_complete', p_step_name, p_payload);
+
+    UPDATE tickets
+        SET last_heartbeat = NOW(), worker_id = p_worker_id
+        WHERE id = p_ticket_id;
+END;
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,36 @@
+-- Migration: 006_optional_step_checkpoint.sql
+-- Description: Allow persist_workflow_step to skip the checkpoint upsert
+-- Purpose: Workers pass a NULL state when a step left the checkpointed state
+--          unchanged; the step event and heartbeat are still written
+
+CREATE OR REPLACE FUNCTION persist_workflow_step(
+    p_ticket_id UUID,
+    p_worker_id TEXT,
+    p_state JSONB,
+    p_current_step TEXT,
+    p_step_name TEXT,
+    p_payload JSONB
+) RETURNS INTEGER AS $$
+DECLARE
+    v_version INTEGER;
+BEGIN
+    IF p_state IS NOT NULL THEN
+        INSERT INTO workflow_checkpoints (ticket_id, state, current_step, updated_at)
+        VALUES (p_ticket_id, p_state, p_current_step, NOW())
+        ON CONFLICT (ticket_id) DO UPDATE
+            SET state = EXCLUDED.state,
+                current_step = EXCLUDED.current_step,
+                updated_at = EXCLUDED.updated_at;
+    END IF;
+
+    INSERT INTO ticket_events (ticket_id, event_type, step_name, payload)
+    VALUES (p_ticket_id, 'step_complete', p_step_name, p_payload);
+
+    UPDATE tickets
+        SET last_heartbeat = NOW(), worker_id = p_worker_id
+        WHERE id = p_ticket_id
+        RETURNING version INTO v_version;
+
+    RETURN v_version;
+END;
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,55 @@
+-- Migration: 008_buffered_step_events.sql
+-- Description: Make the step event in persist_workflow_step optional
+-- Purpose: Workers buffer step_complete events and bulk insert them when the
+--          workflow finishes, so per-step calls pass a NULL step name
+
+CREATE OR REPLACE FUNCTION persist_workflow_step(
+    p_ticket_id UUID,
+    p_worker_id TEXT,
+    p_state JSONB,
+    p_current_step TEXT,
+    p_step_name TEXT,
+    p_payload JSONB,
+    p_messages JSONB DEFAULT NULL,
+    p_message_offset INTEGER DEFAULT 0
+) RETURNS INTEGER AS $$
+DECLARE
+    v_version INTEGER;
+BEGIN
+    IF p_state IS NOT NULL THEN
+        INSERT INTO workflow_checkpoints (ticket_id, state, current_step, updated_at)
+        VALUES (p_ticket_id, p_state, p_current_step, NOW())
+        ON CONFLICT (ticket_id) DO UPDATE
+            SET state = EXCLUDED.state,
+                current_step = EXCLUDED.current_step,
+                updated_at = EXCLUDED.updated_at;
+    END IF;
+
+    IF p_messages IS NOT NULL AND jsonb_array_length(p_messages) > 0 THEN
+        INSERT INTO workflow_checkpoint_messages (ticket_id, seq, type, content, additional_kwargs)
+        SELECT p_ticket_id,
+               p_message_offset + m.ordinality - 1,
+               m.value->>'type',
+               m.value->'content',
+               COALESCE(m.value->'additional_kwargs', '{}')
+        FROM jsonb_array_elements(p_messages) WITH ORDINALITY AS m
+        ON CONFLICT (ticket_id, seq) DO NOTHING;
+
+        UPDATE workflow_checkpoints
+            SET messages_appended_count = p_message_offset + jsonb_array_length(p_messages)
+            WHERE ticket_id = p_ticket_id;
+    END IF;
+
+    IF p_step_name IS NOT NULL THEN
+        INSERT INTO ticket_events (ticket_id, event_type, step_name, payload)
+        VALUES (p_ticket_id, 'step_complete', p_step_name, p_payload);
+    END IF;
+
+    UPDATE tickets
+        SET last_heartbeat = NOW(), worker_id = p_worker_id
+        WHERE id = p_ticket_id
+        RETURNING version INTO v_version;
+
+    RETURN v_version;
+END;
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,25 @@
+-- Migration: 009_acquire_ticket_rpc.sql
+-- Description: Acquire a ticket's processing lock and log the status change together
+-- Purpose: One round trip at the lock contention hotspot instead of an UPDATE
+--          followed by a separate ticket_events INSERT
+
+CREATE OR REPLACE FUNCTION acquire_ticket_for_processing(
+    p_ticket_id UUID,
+    p_worker_id TEXT,
+    p_expected_version INTEGER
+) RETURNS SETOF tickets AS $$
+    WITH upd AS (
+        UPDATE tickets
+            SET status = 'processing',
+                worker_id = p_worker_id,
+                started_at = NOW(),
+                last_heartbeat = NOW()
+            WHERE id = p_ticket_id AND version = p_expected_version
+            RETURNING *
+    ), ev AS (
+        INSERT INTO ticket_events (ticket_id, event_type, payload)
+        SELECT id, 'status_change', '{"old_status": "pending", "new_status": "processing"}'::jsonb
+        FROM upd
+    )
+    SELECT * FROM upd;
+$$ LANGUAGE sql;
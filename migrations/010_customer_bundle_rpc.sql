@@ -0,0 +1,34 @@
+-- Migration: 010_customer_bundle_rpc.sql
+-- Description: Fetch a customer with their recent tickets and orders in one call
+-- Purpose: get_customer_history made three serial PostgREST round trips
+--          (customer, tickets, orders); this returns all three as one JSON object
+
+CREATE OR REPLACE FUNCTION get_customer_bundle(p_id TEXT)
+RETURNS JSONB AS $$
+    WITH customer AS (
+        SELECT * FROM customers WHERE id = p_id OR email = p_id LIMIT 1
+    )
+    SELECT jsonb_build_object(
+        'customer', (SELECT to_jsonb(c) FROM customer c),
+        'tickets', COALESCE((
+            SELECT jsonb_agg(t)
+            FROM (
+                SELECT id, subject, status, created_at
+                FROM tickets
+                WHERE customer_id = p_id
+                ORDER BY created_at DESC
+                LIMIT 5
+            ) t
+        ), '[]'::jsonb),
+        'orders', COALESCE((
+            SELECT jsonb_agg(o)
+            FROM (
+                SELECT id, status, total, created_at
+                FROM orders
+                WHERE customer_id = (SELECT id FROM customer)
+                ORDER BY created_at DESC
+                LIMIT 5
+            ) o
+        ), '[]'::jsonb)
+    );
+$$ LANGUAGE sql STABLE;
@@ -0,0 +1,33 @@
+-- Migration: 011_help_articles_fts.sql
+-- Description: Full-text search over help articles
+-- Purpose: Replace the unindexable title/content ILIKE '%term%' scans with a
+--          GIN-indexed tsvector, ranked by relevance
+
+ALTER TABLE help_articles
+    ADD COLUMN search_vec TSVECTOR GENERATED ALWAYS AS (
+        to_tsvector('english', coalesce(title, '') || ' ' || coalesce(content, ''))
+    ) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_help_articles_fts ON help_articles USING GIN(search_vec);
+
+-- PostgREST can filter on search_vec but not order by ts_rank, so ranked
+-- search goes through a function
+CREATE OR REPLACE FUNCTION search_help_articles(
+    p_query TEXT,
+    p_category TEXT DEFAULT NULL,
+    p_limit INTEGER DEFAULT 5
+) RETURNS TABLE (
+    id UUID,
+    title TEXT,
+    content TEXT,
+    category TEXT,
+    keywords TEXT[],
+    rank REAL
+) AS $$
+    SELECT a.id, a.title, a.content, a.category, a.keywords, ts_rank(a.search_vec, q) AS rank
+    FROM help_articles a, websearch_to_tsquery('english', p_query) q
+    WHERE a.search_vec @@ q
+      AND (p_category IS NULL OR a.category = p_category)
+    ORDER BY rank DESC
+    LIMIT p_limit;
+$$ LANGUAGE sql STABLE;
@@ -0,0 +1,48 @@
+-- Migration: 012_customer_bundle_lookup.sql
+-- Description: Let get_customer_bundle look customers up by a single column
+-- Purpose: "id = p_id OR email = p_id" makes the planner combine both indexes
+--          on every call. The caller already knows which column an identifier
+--          belongs to, so it passes p_lookup ('id' or 'email') and each branch
+--          is a plain index lookup. NULL keeps the old disjunction for
+--          identifiers that fit neither shape.
+
+DROP FUNCTION IF EXISTS get_customer_bundle(TEXT);
+
+CREATE OR REPLACE FUNCTION get_customer_bundle(p_id TEXT, p_lookup TEXT DEFAULT NULL)
+RETURNS JSONB AS $$
+DECLARE
+    v_customer customers%ROWTYPE;
+BEGIN
+    IF p_lookup = 'id' THEN
+        SELECT * INTO v_customer FROM customers WHERE id = p_id;
+    ELSIF p_lookup = 'email' THEN
+        SELECT * INTO v_customer FROM customers WHERE email = p_id;
+    ELSE
+        SELECT * INTO v_customer FROM customers WHERE id = p_id OR email = p_id LIMIT 1;
+    END IF;
+
+    RETURN jsonb_build_object(
+        'customer', CASE WHEN v_customer.id IS NULL THEN NULL ELSE to_jsonb(v_customer) END,
+        'tickets', COALESCE((
+            SELECT jsonb_agg(t)
+            FROM (
+                SELECT id, subject, status, created_at
+                FROM tickets
+                WHERE customer_id = p_id
+                ORDER BY created_at DESC
+                LIMIT 5
+            ) t
+        ), '[]'::jsonb),
+        'orders', COALESCE((
+            SELECT jsonb_agg(o)
+            FROM (
+                SELECT id, status, total, created_at
+                FROM orders
+                WHERE customer_id = v_customer.id
+                ORDER BY created_at DESC
+                LIMIT 5
+            ) o
+        ), '[]'::jsonb)
+    );
+END;
+$$ LANGUAGE plpgsql STABLE;
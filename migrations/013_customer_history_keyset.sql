@@ -0,0 +1,55 @@
+-- Migration: 013_customer_history_keyset.sql
+-- Description: Keyset pagination for a customer's ticket and order history
+-- Purpose: "WHERE customer_id = ? ORDER BY created_at DESC LIMIT 5" had to
+--          fetch and sort the customer's whole history. The composite indexes
+--          serve it as an index range scan, and p_before lets later pages seek
+--          straight past the rows already returned.
+
+CREATE INDEX IF NOT EXISTS idx_tickets_customer_created ON tickets(customer_id, created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_orders_customer_created ON orders(customer_id, created_at DESC);
+
+DROP FUNCTION IF EXISTS get_customer_bundle(TEXT, TEXT);
+
+CREATE OR REPLACE FUNCTION get_customer_bundle(
+    p_id TEXT,
+    p_lookup TEXT DEFAULT NULL,
+    p_before TIMESTAMPTZ DEFAULT NULL
+) RETURNS JSONB AS $$
+DECLARE
+    v_customer customers%ROWTYPE;
+BEGIN
+    IF p_lookup = 'id' THEN
+        SELECT * INTO v_customer FROM customers WHERE id = p_id;
+    ELSIF p_lookup = 'email' THEN
+        SELECT * INTO v_customer FROM customers WHERE email = p_id;
+    ELSE
+        SELECT * INTO v_customer FROM customers WHERE id = p_id OR email = p_id LIMIT 1;
+    END IF;
+
+    RETURN jsonb_build_object(
+        'customer', CASE WHEN v_customer.id IS NULL THEN NULL ELSE to_jsonb(v_customer) END,
+        'tickets', COALESCE((
+            SELECT jsonb_agg(t)
+            FROM (
+                SELECT id, subject, status, created_at
+                FROM tickets
+                WHERE customer_id = p_id
+                  AND (p_before IS NULL OR created_at < p_before)
+                ORDER BY created_at DESC
+                LIMIT 5
+            ) t
+        ), '[]'::jsonb),
+        'orders', COALESCE((
+            SELECT jsonb_agg(o)
+            FROM (
+                SELECT id, status, total, created_at
+                FROM orders
+                WHERE customer_id = v_customer.id
+                  AND (p_before IS NULL OR created_at < p_before)
+                ORDER BY created_at DESC
+                LIMIT 5
+            ) o
+        ), '[]'::jsonb)
+    );
+END;
+$$ LANGUAGE plpgsql STABLE;
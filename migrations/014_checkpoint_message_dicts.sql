@@ -0,0 +1,62 @@
+-- Migration: 014_checkpoint_message_dicts.sql
+-- Description: Store each logged agent message as a full LangChain message dict
+-- Purpose: type/content/additional_kwargs dropped tool_calls and tool_call_id,
+--          so an agent run with tool calls couldn't be resumed from the log.
+--          Workers now send messages_to_dict() output ({"type", "data"}) and
+--          the whole dict is kept in data. Rows logged before this migration
+--          have data NULL and are restored from their old columns.
+
+ALTER TABLE workflow_checkpoint_messages ADD COLUMN data JSONB;
+
+CREATE OR REPLACE FUNCTION persist_workflow_step(
+    p_ticket_id UUID,
+    p_worker_id TEXT,
+    p_state JSONB,
+    p_current_step TEXT,
+    p_step_name TEXT,
+    p_payload JSONB,
+    p_messages JSONB DEFAULT NULL,
+    p_message_offset INTEGER DEFAULT 0
+) RETURNS INTEGER AS $$
+DECLARE
+    v_version INTEGER;
+BEGIN
+    IF p_state IS NOT NULL THEN
+        INSERT INTO workflow_checkpoints (ticket_id, state, current_step, updated_at)
+        VALUES (p_ticket_id, p_state, p_current_step, NOW())
+        ON CONFLICT (ticket_id) DO UPDATE
+            SET state = EXCLUDED.state,
+                current_step = EXCLUDED.current_step,
+                updated_at = EXCLUDED.updated_at;
+    END IF;
+
+    IF p_messages IS NOT NULL AND jsonb_array_length(p_messages) > 0 THEN
+        INSERT INTO workflow_checkpoint_messages
+            (ticket_id, seq, type, content, additional_kwargs, data)
+        SELECT p_ticket_id,
+               p_message_offset + m.ordinality - 1,
+               m.value->>'type',
+               m.value->'data'->'content',
+               COALESCE(m.value->'data'->'additional_kwargs', '{}'),
+               m.value->'data'
+        FROM jsonb_array_elements(p_messages) WITH ORDINALITY AS m
+        ON CONFLICT (ticket_id, seq) DO NOTHING;
+
+        UPDATE workflow_checkpoints
+            SET messages_appended_count = p_message_offset + jsonb_array_length(p_messages)
+            WHERE ticket_id = p_ticket_id;
+    END IF;
+
+    IF p_step_name IS NOT NULL THEN
+        INSERT INTO ticket_events (ticket_id, event_type, step_name, payload)
+        VALUES (p_ticket_id, 'step_complete', p_step_name, p_payload);
+    END IF;
+
+    UPDATE tickets
+        SET last_heartbeat = NOW(), worker_id = p_worker_id
+        WHERE id = p_ticket_id
+        RETURNING version INTO v_version;
+
+    RETURN v_version;
+END;
+$$ LANGUAGE plpgsql;
@@ -8,9 +8,11 @@ from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 
 from src.api.email_routes import router as email_router
 from src.api.routes import router
+from src.common.event_loop import run_sync
 from src.common.logging import get_logger, setup_logging
 from src.common.metrics import REQUEST_DURATION
 from src.common.tracing import clear_request_id, generate_request_id, set_request_id
+from src.db.client import aclose_async_supabase_client
 
 setup_logging()
 logger = get_logger(__name__)
@@ -21,6 +23,12 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
     logger.info("api_starting")
     yield
     logger.info("api_shutting_down")
+    from src.workflow.tools import drain_background_tasks
+
+    # Only the shared loop may touch the async Supabase client's connections.
+    # Background tool tasks run there too and may still need the client.
+    run_sync(drain_background_tasks())
+    run_sync(aclose_async_supabase_client())
 
 
 app = FastAPI(
@@ -1,8 +1,11 @@
+import asyncio
 import hashlib
+import time
 from typing import Optional
 from uuid import UUID, uuid5
 
-from fastapi import APIRouter, HTTPException, Query, status
+from fastapi import APIRouter, HTTPException, Query, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
 
 from src.api.models import (
     ApprovalDecisionRequest,
@@ -16,6 +19,7 @@ from src.api.models import (
     TicketListResponse,
     TicketResponse,
 )
+from src.common.event_loop import run_sync
 from src.common.logging import get_logger
 from src.common.metrics import TICKETS_CREATED
 from src.common.queue import QueueConnection, QueuePublisher
@@ -24,6 +28,7 @@ from src.db.models import (
     ApprovalDecision,
     ApprovalStatus,
     EventType,
+    Ticket,
     TicketCreate,
     TicketEventCreate,
     TicketStatus,
@@ -171,6 +176,54 @@ def get_ticket(ticket_id: UUID) -> TicketResponse:
             detail=f"Ticket {ticket_id} not found",
         )
 
+    return _ticket_response(ticket)
+
+
+# Statuses a ticket stays in until something outside the worker acts
+SETTLED_STATUSES = frozenset({
+    TicketStatus.COMPLETED,
+    TicketStatus.FAILED_PERMANENT,
+    TicketStatus.AWAITING_APPROVAL,
+})
+
+# /wait re-reads the ticket after the first interval, backing off to the ceiling
+WAIT_FIRST_INTERVAL = 0.25
+WAIT_MAX_INTERVAL = 2.0
+
+
+@router.get("/tickets/{ticket_id}/wait", response_model=TicketResponse)
+async def wait_for_ticket(
+    ticket_id: UUID,
+    timeout: float = Query(30.0, gt=0, le=60),
+) -> TicketResponse:
+    """
+    Long-poll a ticket until it settles or timeout seconds pass.
+
+    Returns the ticket as soon as it is completed, failed or awaiting
+    approval, otherwise its current state at the timeout. Clients make one
+    request instead of polling GET /tickets/{id} on an interval.
+
+    Async so waiting doesn't hold a threadpool thread; only the reads do.
+    """
+    ticket_repo = TicketRepository()
+    deadline = time.monotonic() + timeout
+    interval = WAIT_FIRST_INTERVAL
+
+    while True:
+        ticket = await run_in_threadpool(ticket_repo.get_by_id, ticket_id)
+        if ticket is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Ticket {ticket_id} not found",
+            )
+        remaining = deadline - time.monotonic()
+        if ticket.status in SETTLED_STATUSES or remaining <= 0:
+            return _ticket_response(ticket)
+        await asyncio.sleep(min(interval, remaining))
+        interval = min(interval * 2, WAIT_MAX_INTERVAL)
+
+
+def _ticket_response(ticket: Ticket) -> TicketResponse:
     return TicketResponse(
         id=ticket.id,
         customer_id=ticket.customer_id,
@@ -401,7 +454,8 @@ def _execute_approved_action(action_type: str, action_params: dict) -> bool:
     )
 
     if action_type == "process_refund":
-        result = process_refund.invoke(action_params)
+        # Tools are async and use the client bound to the shared event loop
+        result = run_sync(process_refund.ainvoke(action_params))
         return result.get("success", False)
 
     logger.warning("unknown_action_type", action_type=action_type)
@@ -451,8 +505,15 @@ def get_dashboard_stats() -> DashboardStatsResponse:
 # --- Health Endpoint ---
 
 
-@router.get("/health", response_model=HealthResponse)
-def health_check() -> HealthResponse:
+@router.api_route("/health", methods=["GET", "HEAD"], response_model=HealthResponse)
+def health_check(request: Request, response: Response) -> HealthResponse | Response:
+    """
+    Check the database and queue.
+
+    The ETag names the component statuses, so probes that send it back in
+    If-None-Match get a bodyless 304 until something changes. HEAD returns
+    just the headers.
+    """
     db_status = "healthy"
     queue_status = "healthy"
 
@@ -475,6 +536,13 @@ def health_check() -> HealthResponse:
 
     overall = "healthy" if db_status == "healthy" and queue_status == "healthy" else "unhealthy"
 
+    # Revalidate on every request; the checks above always run
+    etag = f'"{db_status}-{queue_status}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    response.headers.update(headers)
+
     return HealthResponse(
         status=overall,
         database=db_status,
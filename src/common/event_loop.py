@@ -0,0 +1,60 @@
+"""Shared background event loop for running async code from worker threads."""
+
+import asyncio
+import threading
+from collections.abc import AsyncIterator, Coroutine
+from functools import lru_cache
+from typing import Any, TypeVar
+
+T = TypeVar("T")
+
+
+@lru_cache
+def get_event_loop() -> asyncio.AbstractEventLoop:
+    """
+    Start (once) and return an event loop running on a daemon thread.
+
+    Async HTTP clients (OpenAI, Supabase) pool connections per loop, so all
+    async work in a process goes through this one loop rather than a fresh
+    asyncio.run() per call.
+    """
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, name="event-loop", daemon=True)
+    thread.start()
+    return loop
+
+
+def run_sync(coro: Coroutine[Any, Any, T]) -> T:
+    """Run coro on the shared loop and block the calling thread for its result."""
+    return asyncio.run_coroutine_threadsafe(coro, get_event_loop()).result()
+
+
+async def run_on_shared_loop(coro: Coroutine[Any, Any, T]) -> T:
+    """Await coro on the shared loop from whichever loop the caller runs on."""
+    loop = get_event_loop()
+    if asyncio.get_running_loop() is loop:
+        return await coro
+    # Cancelling the caller cancels the task on the shared loop too
+    return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, loop))
+
+
+async def iterate_on_shared_loop(iterator: AsyncIterator[T]) -> AsyncIterator[T]:
+    """Drive an async iterator on the shared loop, yielding its items to the caller's loop."""
+
+    async def next_item() -> T:
+        return await anext(iterator)
+
+    async def close() -> None:
+        aclose = getattr(iterator, "aclose", None)
+        if aclose is not None:
+            await aclose()
+
+    try:
+        while True:
+            try:
+                item = await run_on_shared_loop(next_item())
+            except StopAsyncIteration:
+                return
+            yield item
+    finally:
+        await run_on_shared_loop(close())
@@ -1,6 +1,7 @@
 import json
+import random
 from datetime import datetime, timezone
-from typing import Any, Callable
+from typing import Any, Callable, Iterable
 from uuid import UUID
 
 import pika
@@ -13,6 +14,19 @@ from src.common.logging import get_logger
 logger = get_logger(__name__)
 
 
+def compute_retry_delay(attempt: int) -> float:
+    """
+    Backoff before republishing a message that failed on the given attempt.
+
+    Uses ranged jitter: a uniform draw from [base * 2^(n-1), base * 2^n],
+    capped at retry_max_delay_seconds, so workers that collided on the same
+    ticket don't retry it in lockstep.
+    """
+    settings = get_settings()
+    low = settings.retry_base_delay_seconds * 2 ** (attempt - 1)
+    return min(random.uniform(low, 2 * low), settings.retry_max_delay_seconds)
+
+
 class QueueMessage:
     def __init__(self, ticket_id: UUID, attempt: int, enqueued_at: datetime):
         self.ticket_id = ticket_id
@@ -47,6 +61,7 @@ class QueueConnection:
         settings = get_settings()
         self.url = url or settings.rabbitmq_url
         self.queue_name = settings.queue_name
+        self.delay_queue_name = f"{settings.queue_name}_delay"
         self.dlx_name = settings.dlx_name
         self.prefetch_count = settings.prefetch_count
         self._connection: pika.BlockingConnection | None = None
@@ -95,6 +110,19 @@ class QueueConnection:
             },
         )
 
+        # Declare delay queue: messages sit here until their per-message TTL
+        # expires, then dead-letter back onto the main queue. Expiry is only
+        # checked at the head, so a message can wait up to the longest delay
+        # ahead of it; retry delays are capped, which bounds that.
+        self._channel.queue_declare(
+            queue=self.delay_queue_name,
+            durable=True,
+            arguments={
+                "x-dead-letter-exchange": "",
+                "x-dead-letter-routing-key": self.queue_name,
+            },
+        )
+
     def close(self) -> None:
         if self._connection is not None and self._connection.is_open:
             self._connection.close()
@@ -111,31 +139,79 @@ class QueuePublisher:
     def __init__(self, connection: QueueConnection | None = None):
         self.connection = connection or QueueConnection()
 
-    def publish(self, ticket_id: UUID, attempt: int = 1) -> None:
+    _properties = pika.BasicProperties(
+        delivery_mode=pika.DeliveryMode.Persistent,
+        content_type="application/json",
+    )
+
+    def _basic_publish(
+        self,
+        channel: BlockingChannel,
+        ticket_id: UUID,
+        attempt: int,
+        delay_seconds: float = 0.0,
+    ) -> None:
         message = QueueMessage(
             ticket_id=ticket_id,
             attempt=attempt,
             enqueued_at=datetime.now(timezone.utc),
         )
 
-        self.connection.connect()
-        self.connection.channel.basic_publish(
-            exchange="",
-            routing_key=self.connection.queue_name,
-            body=message.to_bytes(),
-            properties=pika.BasicProperties(
+        if delay_seconds > 0:
+            routing_key = self.connection.delay_queue_name
+            properties = pika.BasicProperties(
                 delivery_mode=pika.DeliveryMode.Persistent,
                 content_type="application/json",
-            ),
+                expiration=str(int(delay_seconds * 1000)),
+            )
+        else:
+            routing_key = self.connection.queue_name
+            properties = self._properties
+
+        channel.basic_publish(
+            exchange="",
+            routing_key=routing_key,
+            body=message.to_bytes(),
+            properties=properties,
         )
 
+    def publish(self, ticket_id: UUID, attempt: int = 1, delay_seconds: float = 0.0) -> None:
+        self.connection.connect()
+        self._basic_publish(self.connection.channel, ticket_id, attempt, delay_seconds)
+
         logger.info(
             "message_published",
             ticket_id=str(ticket_id),
             attempt=attempt,
+            delay_seconds=delay_seconds,
             queue=self.connection.queue_name,
         )
 
+    def publish_batch(self, items: Iterable[tuple[UUID, int, float]]) -> int:
+        """
+        Publish several (ticket_id, attempt, delay_seconds) messages back-to-back.
+
+        Without publisher confirms, basic_publish doesn't wait on the broker,
+        so the whole batch is pipelined over the channel in one go.
+
+        Returns the number of messages published.
+        """
+        self.connection.connect()
+        channel = self.connection.channel
+
+        count = 0
+        for ticket_id, attempt, delay_seconds in items:
+            self._basic_publish(channel, ticket_id, attempt, delay_seconds)
+            count += 1
+
+        if count:
+            logger.info(
+                "message_batch_published",
+                count=count,
+                queue=self.connection.queue_name,
+            )
+        return count
+
 
 class QueueConsumer:
     def __init__(self, connection: QueueConnection | None = None):
@@ -145,6 +221,8 @@ class QueueConsumer:
     def consume(
         self,
         callback: Callable[[QueueMessage, Callable[[], None], Callable[[bool], None]], None],
+        on_tick: Callable[[], None] | None = None,
+        prefetch_count: int | None = None,
     ) -> None:
         """
         Start consuming messages from the queue.
@@ -154,10 +232,14 @@ class QueueConsumer:
                 - message: The QueueMessage
                 - ack: Function to acknowledge the message
                 - nack: Function to reject the message (pass requeue=True to requeue)
+            on_tick: Optional function called after each batch of delivered
+                messages has been dispatched, e.g. to flush buffered work.
+            prefetch_count: Overrides the configured prefetch, e.g. to match
+                how many messages the caller can hold in flight.
         """
         self.connection.connect()
         channel = self.connection.channel
-        channel.basic_qos(prefetch_count=self.connection.prefetch_count)
+        channel.basic_qos(prefetch_count=prefetch_count or self.connection.prefetch_count)
 
         def on_message(
             ch: BlockingChannel,
@@ -195,6 +277,16 @@ class QueueConsumer:
 
         while not self._should_stop:
             self.connection._connection.process_data_events(time_limit=1)  # type: ignore
+            if on_tick is not None:
+                on_tick()
+
+    def call_threadsafe(self, callback: Callable[[], None]) -> None:
+        """Schedule callback on the consuming thread, e.g. to ack from a worker thread."""
+        self.connection._connection.add_callback_threadsafe(callback)  # type: ignore
+
+    def run_pending_callbacks(self) -> None:
+        """Run callbacks scheduled with call_threadsafe without waiting for deliveries."""
+        self.connection._connection.process_data_events(time_limit=0)  # type: ignore
 
     def stop(self) -> None:
         self._should_stop = True
@@ -0,0 +1,32 @@
+"""JSON serialization helpers with an optional orjson fast path."""
+
+import json
+from collections.abc import Callable
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - exercised only without the speedups extra
+    orjson = None
+
+
+def dumps(
+    obj: Any,
+    *,
+    sort_keys: bool = False,
+    default: Callable[[Any], Any] | None = None,
+) -> bytes:
+    """Serialize obj to UTF-8 JSON bytes, using orjson when installed."""
+    if orjson is not None:
+        option = orjson.OPT_SORT_KEYS if sort_keys else None
+        return orjson.dumps(obj, default=default, option=option)
+    return json.dumps(
+        obj, separators=(",", ":"), sort_keys=sort_keys, default=default
+    ).encode("utf-8")
+
+
+def loads(data: bytes | str) -> Any:
+    """Deserialize JSON bytes or str, using orjson when installed."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
@@ -1,11 +1,45 @@
 from functools import lru_cache
 
-from supabase import Client, create_client
+import httpx
+from supabase import AsyncClient, AsyncClientOptions, Client, create_client
 
 from src.common.config import get_settings
 
 
-@lru_cache
+@lru_cache(maxsize=1)
 def get_supabase_client() -> Client:
     settings = get_settings()
     return create_client(settings.supabase_url, settings.supabase_key)
+
+
+@lru_cache(maxsize=1)
+def get_async_supabase_client() -> AsyncClient:
+    """
+    Process-wide async client sharing one bounded HTTP connection pool.
+
+    Only use it from the shared event loop (src.common.event_loop.run_sync
+    from threads, run_on_shared_loop from other loops); pooled connections
+    belong to the loop that opened them.
+    """
+    settings = get_settings()
+    http_client = httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=settings.supabase_pool_size,
+            max_keepalive_connections=settings.supabase_pool_size,
+        ),
+        timeout=settings.supabase_timeout_seconds,
+    )
+    # Built directly rather than via create_async_client: with the service
+    # key there's no auth session to restore, so nothing needs awaiting
+    return AsyncClient(
+        settings.supabase_url,
+        settings.supabase_key,
+        options=AsyncClientOptions(httpx_client=http_client),
+    )
+
+
+async def aclose_async_supabase_client() -> None:
+    """Close the async client's connection pool, if the client was created."""
+    if get_async_supabase_client.cache_info().currsize:
+        await get_async_supabase_client().options.httpx_client.aclose()
+        get_async_supabase_client.cache_clear()
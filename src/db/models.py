@@ -82,6 +82,7 @@ class WorkflowCheckpoint(BaseModel):
     state: dict[str, Any]
     current_step: str
     updated_at: datetime
+    messages_appended_count: int = 0
 
 
 class WorkflowCheckpointUpsert(BaseModel):
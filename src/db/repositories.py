@@ -2,6 +2,7 @@ from datetime import datetime, timezone
 from typing import Any
 from uuid import UUID
 
+from postgrest.types import ReturnMethod
 from supabase import Client
 
 from src.common.logging import get_logger
@@ -63,6 +64,27 @@ class TicketRepository:
             return None
         return Ticket(**result.data[0])
 
+    def load_for_processing(
+        self, ticket_id: UUID
+    ) -> tuple[Ticket | None, WorkflowCheckpoint | None]:
+        """Load a ticket and its checkpoint, if any, in one query."""
+        result = (
+            self.client.table("tickets")
+            .select("*, workflow_checkpoints(*)")
+            .eq("id", str(ticket_id))
+            .execute()
+        )
+        if not result.data:
+            return None, None
+
+        row = result.data[0]
+        embedded = row.pop("workflow_checkpoints", None)
+        # One-to-one embeds come back as an object; older PostgREST returns a list
+        if isinstance(embedded, list):
+            embedded = embedded[0] if embedded else None
+        checkpoint = WorkflowCheckpoint(**embedded) if embedded else None
+        return Ticket(**row), checkpoint
+
     def exists(self, ticket_id: UUID) -> bool:
         result = (
             self.client.table("tickets")
@@ -113,23 +135,76 @@ class TicketRepository:
 
         return Ticket(**result.data[0])
 
-    def update_heartbeat(self, ticket_id: UUID, worker_id: str) -> None:
+    def update_heartbeat(self, ticket_id: UUID, worker_id: str) -> int:
+        """Bump the heartbeat and return the ticket's new version."""
         now = datetime.now(timezone.utc)
-        self.client.table("tickets").update(
-            {"last_heartbeat": now.isoformat(), "worker_id": worker_id}
-        ).eq("id", str(ticket_id)).execute()
+        result = (
+            self.client.table("tickets")
+            .update({"last_heartbeat": now.isoformat(), "worker_id": worker_id})
+            .eq("id", str(ticket_id))
+            .execute()
+        )
+        if not result.data:
+            raise TicketNotFoundError(f"Ticket {ticket_id} not found")
+        return result.data[0]["version"]
+
+    def persist_step(
+        self,
+        ticket_id: UUID,
+        worker_id: str,
+        step_name: str | None = None,
+        payload: dict[str, Any] | None = None,
+        checkpoint: WorkflowCheckpointUpsert | None = None,
+        messages: list[dict[str, Any]] | None = None,
+        message_offset: int = 0,
+    ) -> int:
+        """
+        Log the step, bump the heartbeat and upsert the checkpoint in one transaction.
+
+        Pass checkpoint=None when the state hasn't changed to skip the upsert,
+        and step_name=None when the caller logs step events itself.
+        messages are appended to the checkpoint's message log starting at
+        message_offset. Returns the ticket's new version (the heartbeat update
+        increments it).
+        """
+        result = self.client.rpc(
+            "persist_workflow_step",
+            {
+                "p_ticket_id": str(ticket_id),
+                "p_worker_id": worker_id,
+                "p_state": checkpoint.state if checkpoint else None,
+                "p_current_step": checkpoint.current_step if checkpoint else None,
+                "p_step_name": step_name,
+                "p_payload": payload,
+                "p_messages": messages,
+                "p_message_offset": message_offset,
+            },
+        ).execute()
+        if result.data is None:
+            raise TicketNotFoundError(f"Ticket {ticket_id} not found")
+        return result.data
 
     def acquire_for_processing(
         self, ticket_id: UUID, worker_id: str, expected_version: int
     ) -> Ticket:
-        now = datetime.now(timezone.utc)
-        update = TicketUpdate(
-            status=TicketStatus.PROCESSING,
-            worker_id=worker_id,
-            started_at=now,
-            last_heartbeat=now,
-        )
-        return self.update(ticket_id, update, expected_version=expected_version)
+        """
+        Take the processing lock and log the pending -> processing change in one call.
+
+        Raises OptimisticLockError if the ticket's version has moved on.
+        """
+        result = self.client.rpc(
+            "acquire_ticket_for_processing",
+            {
+                "p_ticket_id": str(ticket_id),
+                "p_worker_id": worker_id,
+                "p_expected_version": expected_version,
+            },
+        ).execute()
+        if not result.data:
+            raise OptimisticLockError(
+                f"Version mismatch for ticket {ticket_id}. Expected {expected_version}"
+            )
+        return Ticket(**result.data[0])
 
     def mark_completed(
         self, ticket_id: UUID, result: dict[str, Any], expected_version: int
@@ -188,6 +263,21 @@ class TicketEventRepository:
         result = self.client.table("ticket_events").insert(data).execute()
         return TicketEvent(**result.data[0])
 
+    def bulk_insert(self, events: list[TicketEventCreate]) -> None:
+        """Insert several events with a single multi-row insert."""
+        if not events:
+            return
+        rows = [
+            {
+                "ticket_id": str(event.ticket_id),
+                "event_type": event.event_type.value,
+                "step_name": event.step_name,
+                "payload": event.payload,
+            }
+            for event in events
+        ]
+        self.client.table("ticket_events").insert(rows, returning=ReturnMethod.minimal).execute()
+
     def get_by_ticket_id(self, ticket_id: UUID) -> list[TicketEvent]:
         result = (
             self.client.table("ticket_events")
@@ -272,6 +362,17 @@ class WorkflowCheckpointRepository:
             return None
         return WorkflowCheckpoint(**result.data[0])
 
+    def get_messages(self, ticket_id: UUID) -> list[dict[str, Any]]:
+        """Load the checkpoint's message log in append order."""
+        result = (
+            self.client.table("workflow_checkpoint_messages")
+            .select("type, content, additional_kwargs, data")
+            .eq("ticket_id", str(ticket_id))
+            .order("seq")
+            .execute()
+        )
+        return result.data
+
     def delete(self, ticket_id: UUID) -> None:
         self.client.table("workflow_checkpoints").delete().eq(
             "ticket_id", str(ticket_id)
@@ -6,21 +6,54 @@ Supports SendGrid, Mailgun, Postmark, and generic JSON formats.
 
 import re
 from dataclasses import dataclass, field
-from typing import Any
+from email import policy
+from email.parser import BytesHeaderParser
+from typing import Any, AsyncIterator, Callable
 
 from src.common.logging import get_logger
 
 logger = get_logger(__name__)
 
+# Attachment streams yield chunks of this size
+ATTACHMENT_CHUNK_SIZE = 64 * 1024
+
+# Header blocks larger than this are handed to the stdlib parser
+LARGE_HEADERS_THRESHOLD = 4096
+
+_header_parser = BytesHeaderParser(policy=policy.default)
+
+# "Name <email>" / "<email>" address format
+_NAMED_ADDRESS_RE = re.compile(r'^"?([^"<]*)"?\s*<([^>]+)>$')
+
+# <message-id> tokens in References / In-Reply-To headers
+_MESSAGE_ID_RE = re.compile(r"<[^>]+>")
+
 
 @dataclass
 class EmailAttachment:
-    """Represents an email attachment."""
+    """
+    Represents an email attachment.
+
+    Content is never held in memory; content_stream, when set, returns an
+    async iterator of chunks that can be fed straight to an upload.
+    """
 
     filename: str
     content_type: str
     size: int = 0
-    content: bytes | None = None
+    content_stream: Callable[[], AsyncIterator[bytes]] | None = None
+
+
+def _upload_stream(upload: Any) -> Callable[[], AsyncIterator[bytes]] | None:
+    """Wrap an uploaded file's async read() as a chunked stream factory."""
+    if not hasattr(upload, "read"):
+        return None
+
+    async def stream() -> AsyncIterator[bytes]:
+        while chunk := await upload.read(ATTACHMENT_CHUNK_SIZE):
+            yield chunk
+
+    return stream
 
 
 @dataclass
@@ -65,21 +98,19 @@ class EmailParser:
         # Parse headers for message ID and threading
         headers = EmailParser._parse_headers(data.get("headers", ""))
 
-        # Parse attachments
-        attachments = []
+        # Parse attachments (SendGrid sends each as an UploadFile)
         num_attachments = int(data.get("attachments", 0))
-        for i in range(1, num_attachments + 1):
-            attachment_data = data.get(f"attachment{i}")
-            if attachment_data:
-                # SendGrid sends as UploadFile
-                attachments.append(
-                    EmailAttachment(
-                        filename=getattr(attachment_data, "filename", f"attachment{i}"),
-                        content_type=getattr(
-                            attachment_data, "content_type", "application/octet-stream"
-                        ),
-                    )
-                )
+        attachments = [
+            EmailAttachment(
+                filename=getattr(att, "filename", f"attachment{i}"),
+                content_type=getattr(att, "content_type", "application/octet-stream"),
+                size=getattr(att, "size", None) or 0,
+                content_stream=_upload_stream(att),
+            )
+            for i in range(1, num_attachments + 1)
+            for att in (data.get(f"attachment{i}"),)
+            if att
+        ]
 
         return ParsedEmail(
             from_email=from_email,
@@ -116,19 +147,18 @@ class EmailParser:
         from_email, from_name = EmailParser._parse_email_address(from_field)
 
         # Parse attachments
-        attachments = []
         attachment_count = int(data.get("attachment-count", 0))
-        for i in range(1, attachment_count + 1):
-            att = data.get(f"attachment-{i}")
-            if att:
-                attachments.append(
-                    EmailAttachment(
-                        filename=getattr(att, "filename", f"attachment{i}"),
-                        content_type=getattr(
-                            att, "content_type", "application/octet-stream"
-                        ),
-                    )
-                )
+        attachments = [
+            EmailAttachment(
+                filename=getattr(att, "filename", f"attachment{i}"),
+                content_type=getattr(att, "content_type", "application/octet-stream"),
+                size=getattr(att, "size", None) or 0,
+                content_stream=_upload_stream(att),
+            )
+            for i in range(1, attachment_count + 1)
+            for att in (data.get(f"attachment-{i}"),)
+            if att
+        ]
 
         return ParsedEmail(
             from_email=from_email,
@@ -248,7 +278,7 @@ class EmailParser:
             return "", None
 
         # Match "Name <email>" format
-        match = re.match(r'^"?([^"<]*)"?\s*<([^>]+)>$', address.strip())
+        match = _NAMED_ADDRESS_RE.match(address.strip())
         if match:
             name = match.group(1).strip() or None
             email = match.group(2).strip()
@@ -265,6 +295,9 @@ class EmailParser:
         if not headers_str:
             return headers
 
+        if len(headers_str) > LARGE_HEADERS_THRESHOLD:
+            return EmailParser._parse_large_headers(headers_str)
+
         current_key = None
         current_value = ""
 
@@ -288,6 +321,18 @@ class EmailParser:
 
         return headers
 
+    @staticmethod
+    def _parse_large_headers(headers_str: str) -> dict[str, str]:
+        """
+        Parse a large raw header block with the stdlib email parser.
+
+        Its feed parser does bounded work per line, so oversized or stuffed
+        header blocks can't blow up the hand-rolled continuation handling.
+        Folded values are unfolded to single spaces to match _parse_headers.
+        """
+        msg = _header_parser.parsebytes(headers_str.encode("latin-1", "replace"))
+        return {key.lower(): " ".join(str(value).split()) for key, value in msg.items()}
+
     @staticmethod
     def _parse_references(references: str) -> list[str]:
         """Parse References header into list of message IDs."""
@@ -295,4 +340,18 @@ class EmailParser:
             return []
 
         # Extract all <message-id> patterns
-        return re.findall(r"<[^>]+>", references)
+        return _MESSAGE_ID_RE.findall(references)
+
+
+# Provider name -> parser, so ingest dispatch is a single dict lookup
+PARSERS: dict[str, Callable[[dict[str, Any]], ParsedEmail]] = {
+    "sendgrid": EmailParser.parse_sendgrid,
+    "mailgun": EmailParser.parse_mailgun,
+    "postmark": EmailParser.parse_postmark,
+    "generic": EmailParser.parse_generic,
+}
+
+
+def parse(provider: str, data: dict[str, Any]) -> ParsedEmail:
+    """Parse webhook data for the given provider, defaulting to the generic format."""
+    return PARSERS.get(provider, EmailParser.parse_generic)(data)
@@ -5,13 +5,14 @@ Supports SendGrid, Mailgun, and SMTP backends.
 """
 
 from abc import ABC, abstractmethod
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import Any
 
 import httpx
 
 from src.common.config import get_settings
 from src.common.logging import get_logger
+from src.common.serialization import dumps
 
 logger = get_logger(__name__)
 settings = get_settings()
@@ -31,6 +32,12 @@ class EmailMessage:
     in_reply_to: str | None = None  # For threading
     references: list[str] | None = None  # For threading
 
+    # Pre-joined References header, reused across send retries
+    _references_header: str | None = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        self._references_header = " ".join(self.references) if self.references else None
+
 
 class EmailSender(ABC):
     """Abstract base class for email senders."""
@@ -47,6 +54,10 @@ class SendGridSender(EmailSender):
     def __init__(self, api_key: str):
         self.api_key = api_key
         self.api_url = "https://api.sendgrid.com/v3/mail/send"
+        self._headers = {
+            "Authorization": f"Bearer {api_key}",
+            "Content-Type": "application/json",
+        }
 
     async def send(self, message: EmailMessage) -> dict[str, Any]:
         """Send email via SendGrid API."""
@@ -70,19 +81,16 @@ class SendGridSender(EmailSender):
         headers = {}
         if message.in_reply_to:
             headers["In-Reply-To"] = message.in_reply_to
-        if message.references:
-            headers["References"] = " ".join(message.references)
+        if message._references_header:
+            headers["References"] = message._references_header
         if headers:
             payload["headers"] = headers
 
         async with httpx.AsyncClient() as client:
             response = await client.post(
                 self.api_url,
-                json=payload,
-                headers={
-                    "Authorization": f"Bearer {self.api_key}",
-                    "Content-Type": "application/json",
-                },
+                content=dumps(payload),
+                headers=self._headers,
             )
 
             if response.status_code in (200, 202):
@@ -112,6 +120,8 @@ class MailgunSender(EmailSender):
         self.api_key = api_key
         self.domain = domain
         self.api_url = f"https://api.mailgun.net/v3/{domain}/messages"
+        # BasicAuth encodes the Authorization header once at construction
+        self._auth = httpx.BasicAuth("api", api_key)
 
     async def send(self, message: EmailMessage) -> dict[str, Any]:
         """Send email via Mailgun API."""
@@ -135,14 +145,14 @@ class MailgunSender(EmailSender):
         # Add threading headers
         if message.in_reply_to:
             data["h:In-Reply-To"] = message.in_reply_to
-        if message.references:
-            data["h:References"] = " ".join(message.references)
+        if message._references_header:
+            data["h:References"] = message._references_header
 
         async with httpx.AsyncClient() as client:
             response = await client.post(
                 self.api_url,
                 data=data,
-                auth=("api", self.api_key),
+                auth=self._auth,
             )
 
             if response.status_code == 200:
@@ -207,6 +217,9 @@ async def send_ticket_response(
     ticket_id: str,
     response_text: str,
     response_html: str | None = None,
+    *,
+    channel: str | None = None,
+    customer_email: str | None = None,
 ) -> dict[str, Any]:
     """
     Send the agent's response back to the customer via email.
@@ -215,10 +228,18 @@ async def send_ticket_response(
         ticket_id: The ticket ID
         response_text: Plain text response
         response_html: Optional HTML response
+        channel: Ticket channel, if the caller already knows it. Non-email
+            channels are skipped without loading the ticket.
+        customer_email: Recipient address, overriding the ticket metadata
 
     Returns:
         Dict with send result
     """
+    # Only send email responses for email channel tickets
+    if channel is not None and channel != "email":
+        logger.info("skip_email_response_non_email_channel", ticket_id=ticket_id)
+        return {"success": True, "skipped": True, "reason": "Not an email ticket"}
+
     from src.db.client import get_supabase_client
 
     client = get_supabase_client()
@@ -238,7 +259,7 @@ async def send_ticket_response(
         return {"success": True, "skipped": True, "reason": "Not an email ticket"}
 
     metadata = ticket.get("metadata", {})
-    customer_email = metadata.get("from_email")
+    customer_email = customer_email or metadata.get("from_email")
 
     if not customer_email:
         logger.error("no_customer_email", ticket_id=ticket_id)
@@ -249,16 +270,14 @@ async def send_ticket_response(
 
     # Create reply subject
     original_subject = ticket.get("subject", "")
-    if not original_subject.lower().startswith("re:"):
+    if original_subject[:3].lower() != "re:":
         subject = f"Re: {original_subject}"
     else:
         subject = original_subject
 
     # Build threading references
     message_id = metadata.get("message_id")
-    references = [message_id] if message_id else []
-    if metadata.get("in_reply_to"):
-        references.insert(0, metadata["in_reply_to"])
+    references = [r for r in (metadata.get("in_reply_to"), message_id) if r]
 
     # Create reply-to address with ticket ID for tracking
     reply_to = f"support+{ticket_id}@{settings.email_domain}" if settings.email_domain else None
@@ -6,6 +6,7 @@ import httpx
 
 from src.common.config import get_settings
 from src.common.logging import get_logger
+from src.common.serialization import dumps
 
 logger = get_logger(__name__)
 settings = get_settings()
@@ -68,13 +69,14 @@ def create_github_issue(
                 headers={
                     "Authorization": f"Bearer {settings.github_token}",
                     "Accept": "application/vnd.github.v3+json",
+                    "Content-Type": "application/json",
                     "X-GitHub-Api-Version": "2022-11-28"
                 },
-                json={
+                content=dumps({
                     "title": title,
                     "body": body,
                     "labels": labels
-                }
+                })
             )
 
             if response.status_code == 201:
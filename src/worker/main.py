@@ -1,10 +1,21 @@
 import signal
 import sys
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Callable
 
+from src.common.event_loop import run_sync
 from src.common.logging import get_logger, setup_logging
-from src.common.queue import QueueConsumer, QueueMessage, QueuePublisher
+from src.common.queue import (
+    QueueConsumer,
+    QueueMessage,
+    QueuePublisher,
+    compute_retry_delay,
+)
 from src.common.config import get_settings
+from src.db.client import aclose_async_supabase_client
 from src.worker.processor import TicketProcessor
+from src.workflow.tools import drain_background_tasks
 
 setup_logging()
 logger = get_logger(__name__)
@@ -25,36 +36,99 @@ def main() -> None:
     signal.signal(signal.SIGTERM, handle_shutdown)
     signal.signal(signal.SIGINT, handle_shutdown)
 
-    def process_message(
+    # Bind hot-path lookups once; process_message runs per delivered message
+    max_retries = settings.max_retries
+    process = processor.process
+    publish_batch = publisher.publish_batch
+    log_err = logger.error
+
+    # Retries are buffered and republished as one batch per consumer tick,
+    # each with a jittered backoff so contended tickets spread out in time
+    requeues: list[tuple[QueueMessage, Callable[[], None], Callable[[bool], None]]] = []
+
+    def flush_requeues() -> None:
+        if not requeues:
+            return
+        try:
+            publish_batch(
+                (m.ticket_id, m.attempt + 1, compute_retry_delay(m.attempt))
+                for m, _, _ in requeues
+            )
+        except Exception as e:
+            log_err("requeue_batch_error", count=len(requeues), error=str(e))
+            for _, _, nack in requeues:
+                nack(requeue=True)
+        else:
+            for _, ack, _ in requeues:
+                ack()  # Ack originals, new messages published
+        requeues.clear()
+
+    def settle(
         message: QueueMessage,
-        ack: callable,
-        nack: callable,
+        ack: Callable[[], None],
+        nack: Callable[[bool], None],
+        completed: bool | None,
+    ) -> None:
+        # Runs on the consumer thread; completed is None when processing raised
+        if completed is None:
+            nack(requeue=message.attempt < max_retries)
+        elif completed:
+            ack()
+        elif message.attempt < max_retries:
+            # Requeue with incremented attempt
+            requeues.append((message, ack, nack))
+        else:
+            nack(requeue=False)  # Send to DLX
+
+    def run(
+        message: QueueMessage,
+        ack: Callable[[], None],
+        nack: Callable[[bool], None],
     ) -> None:
         try:
-            completed = processor.process(message.ticket_id, message.attempt)
-
-            if completed:
-                ack()
-            else:
-                # Requeue with incremented attempt
-                if message.attempt < settings.max_retries:
-                    publisher.publish(message.ticket_id, message.attempt + 1)
-                    ack()  # Ack original, new message published
-                else:
-                    nack(requeue=False)  # Send to DLX
+            completed = process(message.ticket_id, message.attempt)
         except Exception as e:
-            logger.error(
+            log_err(
                 "message_handler_error",
                 ticket_id=str(message.ticket_id),
                 error=str(e),
             )
-            nack(requeue=message.attempt < settings.max_retries)
+            completed = None
+        # pika channels aren't thread-safe; ack/nack back on the consumer thread
+        call_threadsafe(partial(settle, message, ack, nack, completed))
+
+    # Tickets run on a bounded pool. Prefetch caps unacked deliveries at the
+    # pool size plus queue_capacity, so the backlog stays in the broker rather
+    # than piling up in memory or opening more DB/LLM sessions than allowed.
+    executor = ThreadPoolExecutor(
+        max_workers=settings.max_concurrent_tickets, thread_name_prefix="ticket"
+    )
+    prefetch_count = settings.max_concurrent_tickets + settings.queue_capacity
+    call_threadsafe = consumer.call_threadsafe
+
+    def process_message(
+        message: QueueMessage,
+        ack: Callable[[], None],
+        nack: Callable[[bool], None],
+    ) -> None:
+        executor.submit(run, message, ack, nack)
 
     try:
-        consumer.consume(process_message)
+        consumer.consume(process_message, on_tick=flush_requeues, prefetch_count=prefetch_count)
     except KeyboardInterrupt:
         logger.info("keyboard_interrupt")
     finally:
+        # Let in-flight tickets finish and settle their messages before exiting
+        executor.shutdown(wait=True)
+        try:
+            consumer.run_pending_callbacks()
+            flush_requeues()
+        except Exception as e:
+            log_err("shutdown_settle_error", error=str(e))
+        # Give fire-and-forget tool tasks (e.g. GitHub issue filing) a
+        # bounded chance to finish before their loop's client is closed
+        run_sync(drain_background_tasks())
+        run_sync(aclose_async_supabase_client())
         logger.info("worker_stopped")
 
 
@@ -1,21 +1,27 @@
+import asyncio
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime, timezone
+from functools import lru_cache
 from typing import Any
 from uuid import UUID
 
 from src.common.config import get_settings
+from src.common.event_loop import run_sync
 from src.common.logging import get_logger
+from src.common.serialization import dumps
 from src.db.models import (
     ApprovalRequestCreate,
     EventType,
     TicketEventCreate,
     TicketStatus,
     TicketUpdate,
+    WorkflowCheckpointUpsert,
 )
 from src.db.repositories import (
     ApprovalRepository,
     OptimisticLockError,
     TicketEventRepository,
-    TicketNotFoundError,
     TicketRepository,
     WorkflowCheckpointRepository,
 )
@@ -23,27 +29,108 @@ from src.db.repositories import (
 logger = get_logger(__name__)
 settings = get_settings()
 
+# State that comes straight from the ticket row. It's rebuilt on resume, so
+# checkpoints only carry what the workflow itself produced.
+CONSTANT_STATE_KEYS = frozenset({"ticket_id", "customer_id", "subject", "body"})
+
+# Leading agent messages (system prompt + ticket) rebuilt from the ticket
+AGENT_PROLOGUE_LENGTH = 2
+
+# Message class names stored by checkpoints written before full message
+# dicts, mapped to their messages_from_dict type
+_LEGACY_MESSAGE_TYPES = {
+    "SystemMessage": "system",
+    "HumanMessage": "human",
+    "AIMessage": "ai",
+    "ToolMessage": "tool",
+}
+
+
+# Agent ticket prompt, filled from the ticket's fields
+_TICKET_TEMPLATE = """## Support Ticket
+
+**Ticket ID:** {id}
+**Customer ID:** {customer_id}
+**Subject:** {subject}
+
+**Message:**
+{body}
+
+Please analyze this ticket and help resolve the customer's issue."""
+
+
+def _get_system_message():
+    """System prompt message shared by every agent run."""
+    # Imported lazily like the workflow itself, so legacy workers don't load the agent
+    from src.workflow.agent import SYSTEM_MESSAGE
+
+    return SYSTEM_MESSAGE
+
+
+@lru_cache
+def _get_workflow(use_agent: bool):
+    """Compile the workflow once per process, shared by every processor."""
+    if use_agent:
+        from src.workflow.agent import get_compiled_agent
+
+        return get_compiled_agent()
+
+    from src.workflow.graph import get_compiled_workflow
+
+    return get_compiled_workflow()
+
+
+@lru_cache
+def _get_persist_pool() -> ThreadPoolExecutor:
+    """I/O pool for step persistence, so DB writes overlap the next workflow step."""
+    return ThreadPoolExecutor(
+        max_workers=settings.persist_pool_size, thread_name_prefix="persist"
+    )
+
+
+@lru_cache
+def _get_repositories() -> tuple[
+    TicketRepository, TicketEventRepository, WorkflowCheckpointRepository, ApprovalRepository
+]:
+    """Create the repositories once per process, shared by every processor."""
+    return (
+        TicketRepository(),
+        TicketEventRepository(),
+        WorkflowCheckpointRepository(),
+        ApprovalRepository(),
+    )
+
+
+@dataclass(slots=True)
+class TicketRun:
+    """Bookkeeping for one in-flight ticket run."""
+
+    ticket_id: UUID
+    # Latest known version, kept current by each persisted step so completion
+    # doesn't need to re-read the row
+    version: int
+    # Fingerprint of the last checkpoint state written
+    checkpoint_hash: int | None = None
+    # Agent messages already in the checkpoint message log
+    message_count: int = 0
+
+
 
 class TicketProcessor:
     def __init__(self):
-        self.ticket_repo = TicketRepository()
-        self.event_repo = TicketEventRepository()
-        self.checkpoint_repo = WorkflowCheckpointRepository()
-        self.approval_repo = ApprovalRepository()
+        (
+            self.ticket_repo,
+            self.event_repo,
+            self.checkpoint_repo,
+            self.approval_repo,
+        ) = _get_repositories()
         self.worker_id = settings.worker_id
         self.use_agent = settings.use_agent_workflow
 
-        # Initialize the appropriate workflow
-        if self.use_agent:
-            from src.workflow.agent import get_compiled_agent
-
-            self.workflow = get_compiled_agent()
-            logger.info("processor_initialized", mode="agent")
-        else:
-            from src.workflow.graph import get_compiled_workflow
-
-            self.workflow = get_compiled_workflow()
-            logger.info("processor_initialized", mode="legacy")
+        # Compiled workflow is cached per process
+        self.workflow = _get_workflow(self.use_agent)
+        self._persist_pool = _get_persist_pool()
+        logger.info("processor_initialized", mode="agent" if self.use_agent else "legacy")
 
     def process(self, ticket_id: UUID, attempt: int) -> bool:
         """
@@ -54,8 +141,8 @@ class TicketProcessor:
         """
         logger.info("processing_ticket", ticket_id=str(ticket_id), attempt=attempt)
 
-        # Load ticket
-        ticket = self.ticket_repo.get_by_id(ticket_id)
+        # Load ticket, plus its checkpoint in case we're resuming
+        ticket, checkpoint = self.ticket_repo.load_for_processing(ticket_id)
         if ticket is None:
             logger.error("ticket_not_found", ticket_id=str(ticket_id))
             return True  # Ack message, data inconsistency
@@ -86,7 +173,7 @@ class TicketProcessor:
                     )
                     return False  # Requeue
 
-        # Acquire processing lock
+        # Acquire processing lock (also logs the status change)
         try:
             ticket = self.ticket_repo.acquire_for_processing(
                 ticket_id, self.worker_id, ticket.version
@@ -95,35 +182,66 @@ class TicketProcessor:
             logger.info("lock_conflict", ticket_id=str(ticket_id))
             return False  # Requeue
 
-        self.event_repo.log_status_change(
-            ticket_id, TicketStatus.PENDING, TicketStatus.PROCESSING
-        )
+        run = TicketRun(ticket_id=ticket_id, version=ticket.version)
 
-        # Load checkpoint if resuming
-        checkpoint = self.checkpoint_repo.get_by_ticket_id(ticket_id)
         initial_state: dict[str, Any]
 
+        # Stale checkpoints would re-feed obsolete context to the LLM; start over
+        if checkpoint:
+            age = (datetime.now(timezone.utc) - checkpoint.updated_at).total_seconds()
+            if age > settings.checkpoint_max_age_seconds:
+                logger.info(
+                    "checkpoint_expired",
+                    ticket_id=str(ticket_id),
+                    step=checkpoint.current_step,
+                    age_seconds=int(age),
+                )
+                self.checkpoint_repo.delete(ticket_id)
+                checkpoint = None
+
         if checkpoint:
             logger.info(
                 "resuming_from_checkpoint",
                 ticket_id=str(ticket_id),
                 step=checkpoint.current_step,
             )
-            initial_state = checkpoint.state
+            messages = (
+                self.checkpoint_repo.get_messages(ticket_id)
+                if checkpoint.messages_appended_count
+                else []
+            )
+            try:
+                initial_state = self._restore_state(ticket, checkpoint.state, messages)
+                run.message_count = len(messages)
+            except ValueError as e:
+                # Legacy rows can lack fields a message needs (a tool result
+                # without its tool_call_id); rerun the ticket from the start
+                logger.warning(
+                    "checkpoint_unrestorable", ticket_id=str(ticket_id), error=str(e)
+                )
+                self.checkpoint_repo.delete(ticket_id)
+                initial_state = self._create_initial_state(ticket)
         else:
             initial_state = self._create_initial_state(ticket)
 
         # Execute workflow
         try:
-            final_state = self._execute_workflow(ticket_id, initial_state)
+            final_state = None
+            if self.use_agent and not checkpoint:
+                # Trivial tickets skip the agent (and its LLM calls) entirely
+                from src.workflow.agent import fast_path
+
+                final_state = run_sync(
+                    fast_path(ticket.subject, ticket.body, ticket.customer_id)
+                )
+            if final_state is None:
+                final_state = self._execute_workflow(run, initial_state)
 
             # Extract result based on workflow type
             result = self._extract_result(final_state)
 
-            # Reload ticket to get current version (heartbeats increment it)
-            current_ticket = self.ticket_repo.get_by_id(ticket_id)
-            if current_ticket is None:
-                raise TicketNotFoundError(f"Ticket {ticket_id} disappeared")
+            # Heartbeats increment the version; persist_step tracks it for us
+            version = run.version
 
             # Check if workflow is waiting for approval
             pending_approval = result.get("pending_approval")
@@ -143,9 +261,7 @@ class TicketProcessor:
                 )
 
                 # Mark ticket as awaiting approval
-                self.ticket_repo.mark_awaiting_approval(
-                    ticket_id, result, current_ticket.version
-                )
+                self.ticket_repo.mark_awaiting_approval(ticket_id, result, version)
                 self.event_repo.log_status_change(
                     ticket_id, TicketStatus.PROCESSING, TicketStatus.AWAITING_APPROVAL
                 )
@@ -155,7 +271,7 @@ class TicketProcessor:
                 return True
 
             # Normal completion
-            self.ticket_repo.mark_completed(ticket_id, result, current_ticket.version)
+            self.ticket_repo.mark_completed(ticket_id, result, version)
             self.event_repo.log_status_change(
                 ticket_id, TicketStatus.PROCESSING, TicketStatus.COMPLETED
             )
@@ -177,10 +293,7 @@ class TicketProcessor:
 
             # Check if max retries reached
             if attempt >= settings.max_retries:
-                # Reload for current version
-                current_ticket = self.ticket_repo.get_by_id(ticket_id)
-                version = current_ticket.version if current_ticket else 1
-                self.ticket_repo.mark_failed_permanent(ticket_id, str(e), version)
+                self.ticket_repo.mark_failed_permanent(ticket_id, str(e), run.version)
                 self.event_repo.log_status_change(
                     ticket_id, TicketStatus.PROCESSING, TicketStatus.FAILED_PERMANENT
                 )
@@ -196,20 +309,9 @@ class TicketProcessor:
         """Create initial state based on workflow type."""
         if self.use_agent:
             # Agent workflow needs messages
-            from langchain_core.messages import HumanMessage, SystemMessage
-
-            from src.workflow.agent import SYSTEM_PROMPT
-
-            ticket_message = f"""## Support Ticket
-
-**Ticket ID:** {ticket.id}
-**Customer ID:** {ticket.customer_id}
-**Subject:** {ticket.subject}
-
-**Message:**
-{ticket.body}
+            from langchain_core.messages import HumanMessage
 
-Please analyze this ticket and help resolve the customer's issue."""
+            ticket_message = _TICKET_TEMPLATE.format_map(ticket.__dict__)
 
             return {
                 "ticket_id": str(ticket.id),
@@ -217,7 +319,7 @@ Please analyze this ticket and help resolve the customer's issue."""
                 "subject": ticket.subject,
                 "body": ticket.body,
                 "messages": [
-                    SystemMessage(content=SYSTEM_PROMPT),
+                    _get_system_message(),
                     HumanMessage(content=ticket_message),
                 ],
                 "final_response": None,
@@ -234,6 +336,46 @@ Please analyze this ticket and help resolve the customer's issue."""
                 "body": ticket.body,
             }
 
+    def _restore_state(
+        self,
+        ticket,
+        checkpoint_state: dict[str, Any],
+        messages: list[dict[str, Any]],
+    ) -> dict[str, Any]:
+        """Rebuild workflow state from the ticket, its checkpointed state and message log."""
+        state = self._create_initial_state(ticket)
+        for key, value in checkpoint_state.items():
+            if key == "messages":
+                # Checkpoints written before the message log kept the whole
+                # conversation inline; the prologue was just rebuilt above
+                state["messages"] = state["messages"] + self._deserialize_messages(
+                    value[AGENT_PROLOGUE_LENGTH:]
+                )
+            else:
+                state[key] = value
+        if messages:
+            state["messages"] = state["messages"] + self._deserialize_messages(messages)
+        return state
+
+    def _deserialize_messages(self, rows: list[dict[str, Any]]) -> list:
+        """Rebuild agent messages from message log rows or legacy inline dicts."""
+        from langchain_core.messages import messages_from_dict
+
+        dicts = []
+        for row in rows:
+            if row.get("data") is not None:
+                dicts.append({"type": row["type"], "data": row["data"]})
+            else:
+                # Legacy {"type": class name, "content", "additional_kwargs"}
+                dicts.append({
+                    "type": _LEGACY_MESSAGE_TYPES.get(row["type"], row["type"]),
+                    "data": {
+                        "content": row["content"],
+                        "additional_kwargs": row.get("additional_kwargs") or {},
+                    },
+                })
+        return messages_from_dict(dicts)
+
     def _extract_result(self, final_state: dict[str, Any]) -> dict[str, Any]:
         """Extract result based on workflow type."""
         if self.use_agent:
@@ -250,73 +392,136 @@ Please analyze this ticket and help resolve the customer's issue."""
                 "review_notes": final_state.get("review_notes"),
             }
 
-    def _execute_workflow(
-        self, ticket_id: UUID, initial_state: dict[str, Any]
-    ) -> dict[str, Any]:
+    def _execute_workflow(self, run: TicketRun, initial_state: dict[str, Any]) -> dict[str, Any]:
         """Execute the workflow with checkpoint persistence."""
+        # Workflow nodes may be async (the legacy pipeline fans out in
+        # parallel), so runs are driven on the shared event loop
+        return run_sync(self._astream_workflow(run, initial_state))
+
+    async def _astream_workflow(
+        self, run: TicketRun, initial_state: dict[str, Any]
+    ) -> dict[str, Any]:
+        ticket_id = run.ticket_id
         config = {"configurable": {"thread_id": str(ticket_id)}}
 
-        final_state = initial_state
+        # Copied once up front so the merge below can mutate in place
+        final_state = dict(initial_state)
+        messages = list(initial_state.get("messages", []))
+        actions_taken = list(initial_state.get("actions_taken", []))
+        if self.use_agent:
+            final_state["messages"] = messages
+            final_state["actions_taken"] = actions_taken
+
+        # step_complete events are buffered and written in one insert at the end,
+        # including when the workflow fails partway through
+        step_events: list[TicketEventCreate] = []
 
-        for event in self.workflow.stream(initial_state, config):
-            # event is a dict with node name as key
-            for node_name, node_output in event.items():
-                if isinstance(node_output, dict):
+        # Each step is written in the background while the next one runs; a
+        # ticket has at most one write in flight so steps land in order
+        pending: Future[int] | None = None
+        try:
+            async for event in self.workflow.astream(initial_state, config):
+                # event is a dict with node name as key. Nodes always return
+                # dict updates; the assert is stripped under python -O.
+                assert all(isinstance(v, dict) for v in event.values()), event
+                for node_name, node_output in event.items():
                     # Merge state carefully for agent workflow
-                    if self.use_agent and "messages" in node_output:
-                        # Messages need special handling - they accumulate
-                        current_messages = final_state.get("messages", [])
-                        new_messages = node_output.get("messages", [])
-                        final_state = {
-                            **final_state,
-                            **node_output,
-                            "messages": current_messages + list(new_messages),
-                        }
+                    if self.use_agent:
+                        # Messages and actions_taken have reducers, so nodes
+                        # emit only the new entries and they accumulate here
+                        final_state.update(node_output)
+                        messages.extend(node_output.get("messages", ()))
+                        final_state["messages"] = messages
+                        actions_taken.extend(node_output.get("actions_taken", ()))
+                        final_state["actions_taken"] = actions_taken
                     else:
-                        final_state = {**final_state, **node_output}
+                        final_state.update(node_output)
 
-                    # Save checkpoint (serialize messages for agent)
+                    # Save checkpoint (serialize messages for agent), skipping
+                    # the write when the step didn't change checkpointed state
                     checkpoint_state = self._serialize_state_for_checkpoint(final_state)
+                    fingerprint = hash(dumps(checkpoint_state, sort_keys=True, default=str))
 
-                    from src.db.models import WorkflowCheckpointUpsert
-
-                    self.checkpoint_repo.upsert(
-                        WorkflowCheckpointUpsert(
+                    checkpoint = None
+                    if fingerprint != run.checkpoint_hash:
+                        checkpoint = WorkflowCheckpointUpsert(
                             ticket_id=ticket_id,
                             state=checkpoint_state,
                             current_step=node_output.get("current_step", node_name),
                         )
-                    )
+                        run.checkpoint_hash = fingerprint
+
+                    # Only messages added since the last step go to the log
+                    logged = run.message_count
+                    new_messages = None
+                    if self.use_agent:
+                        new_messages = self._serialize_messages(
+                            final_state["messages"][AGENT_PROLOGUE_LENGTH + logged :]
+                        )
+                        run.message_count = logged + len(new_messages)
 
-                    # Log step completion
-                    self.event_repo.log_step_complete(
+                    # Checkpoint, messages and heartbeat in one round trip
+                    if pending is not None:
+                        run.version = await asyncio.wrap_future(pending)
+                    pending = self._persist_pool.submit(
+                        self.ticket_repo.persist_step,
                         ticket_id,
-                        node_name,
-                        {"output_keys": list(node_output.keys())},
+                        worker_id=self.worker_id,
+                        checkpoint=checkpoint,
+                        messages=new_messages,
+                        message_offset=logged,
+                    )
+                    step_events.append(
+                        TicketEventCreate(
+                            ticket_id=ticket_id,
+                            event_type=EventType.STEP_COMPLETE,
+                            step_name=node_name,
+                            payload={"output_keys": list(node_output.keys())},
+                        )
                     )
 
-                    # Update heartbeat
-                    self.ticket_repo.update_heartbeat(ticket_id, self.worker_id)
+            if pending is not None:
+                run.version = await asyncio.wrap_future(pending)
+                pending = None
+        finally:
+            if pending is not None:
+                # Workflow failed; let the last write settle before logging events.
+                # A write that landed bumped the row version, and the failure
+                # path needs it to mark the ticket.
+                settled = asyncio.wrap_future(pending)
+                await asyncio.wait([settled])
+                if not settled.exception():
+                    run.version = settled.result()
+            try:
+                await asyncio.wrap_future(
+                    self._persist_pool.submit(self.event_repo.bulk_insert, step_events)
+                )
+            except Exception as e:
+                logger.error(
+                    "step_events_flush_error",
+                    ticket_id=str(ticket_id),
+                    count=len(step_events),
+                    error=str(e),
+                )
 
         return final_state
 
     def _serialize_state_for_checkpoint(self, state: dict[str, Any]) -> dict[str, Any]:
-        """Serialize state for JSON storage in checkpoint."""
-        serialized = {}
-
-        for key, value in state.items():
-            if key == "messages":
-                # Serialize messages to dicts
-                serialized[key] = [
-                    {
-                        "type": type(msg).__name__,
-                        "content": msg.content,
-                        "additional_kwargs": getattr(msg, "additional_kwargs", {}),
-                    }
-                    for msg in value
-                    if hasattr(msg, "content")
-                ]
-            else:
-                serialized[key] = value
+        """
+        Serialize state for JSON storage in checkpoint.
 
-        return serialized
+        Ticket fields are left out since they're constant for the run and
+        rebuilt by _restore_state. Messages go to the append-only message log.
+        """
+        return {
+            key: value
+            for key, value in state.items()
+            if key not in CONSTANT_STATE_KEYS and key != "messages"
+        }
+
+    def _serialize_messages(self, messages: list) -> list[dict[str, Any]]:
+        """Serialize agent messages for the checkpoint message log."""
+        from langchain_core.messages import messages_to_dict
+
+        # Full dicts keep tool_calls and tool_call_id, which resume needs
+        return messages_to_dict(messages)
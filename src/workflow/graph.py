@@ -1,5 +1,10 @@
-from langgraph.graph import END, StateGraph
+from collections.abc import AsyncIterator
+from functools import lru_cache
+from typing import Any
 
+from langgraph.graph import END, START, StateGraph
+
+from src.common.event_loop import iterate_on_shared_loop, run_on_shared_loop
 from src.workflow.nodes import (
     classify_node,
     draft_node,
@@ -8,7 +13,7 @@ from src.workflow.nodes import (
     research_node,
     review_node,
 )
-from src.workflow.state import WorkflowState
+from src.workflow.state import TicketInput, WorkflowState
 
 
 def create_workflow() -> StateGraph:
@@ -24,11 +29,12 @@ def create_workflow() -> StateGraph:
     workflow.add_node("review", review_node)
     workflow.add_node("finalize", finalize_node)
 
-    # Define edges (sequential flow)
-    workflow.set_entry_point("classify")
-    workflow.add_edge("classify", "extract")
-    workflow.add_edge("extract", "research")
-    workflow.add_edge("research", "draft")
+    # classify, extract and research only read the ticket, so they fan out
+    # from the start in parallel; draft waits for all three
+    workflow.add_edge(START, "classify")
+    workflow.add_edge(START, "extract")
+    workflow.add_edge(START, "research")
+    workflow.add_edge(["classify", "extract", "research"], "draft")
     workflow.add_edge("draft", "review")
     workflow.add_edge("review", "finalize")
     workflow.add_edge("finalize", END)
@@ -36,7 +42,56 @@ def create_workflow() -> StateGraph:
     return workflow
 
 
+@lru_cache(maxsize=1)
 def get_compiled_workflow():
-    """Get the compiled workflow ready for execution."""
+    """
+    Get the compiled workflow ready for execution.
+
+    Compiled once per process; the graph is stateless between runs.
+    """
     workflow = create_workflow()
     return workflow.compile()
+
+
+async def process_tickets_batch(
+    tickets: list[TicketInput], max_concurrency: int = 10
+) -> list[dict[str, Any]]:
+    """
+    Run a backlog of tickets through the workflow concurrently.
+
+    Uses the graph's abatch, so at most max_concurrency tickets (and their
+    LLM calls) are in flight at once. Returns final states in input order.
+    Runs on the shared event loop, which owns the async Supabase client the
+    tools use, whatever loop the caller is on.
+    """
+    states = [
+        {
+            "ticket_id": str(ticket.ticket_id),
+            "customer_id": ticket.customer_id,
+            "subject": ticket.subject,
+            "body": ticket.body,
+        }
+        for ticket in tickets
+    ]
+    return await run_on_shared_loop(
+        get_compiled_workflow().abatch(states, config={"max_concurrency": max_concurrency})
+    )
+
+
+async def stream_draft(state: dict[str, Any]) -> AsyncIterator[str]:
+    """Run the workflow on state and yield the draft response's tokens as they stream."""
+    # The workflow runs on the shared loop; only the tokens cross to the caller's
+    async for token in iterate_on_shared_loop(_draft_tokens(state)):
+        yield token
+
+
+async def _draft_tokens(state: dict[str, Any]) -> AsyncIterator[str]:
+    """Yield the draft node's streamed tokens from a workflow run on state."""
+    async for event in get_compiled_workflow().astream_events(state, version="v2"):
+        if (
+            event["event"] == "on_chat_model_stream"
+            and event["metadata"].get("langgraph_node") == "draft"
+        ):
+            token = event["data"]["chunk"].content
+            if token:
+                yield token
@@ -1,161 +1,268 @@
-import re
+import asyncio
+import atexit
 from typing import Any
 
-from langchain_openai import ChatOpenAI
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
+from langchain_openai import ChatOpenAI, OpenAIEmbeddings
 
 from src.common.config import get_settings
 from src.common.logging import get_logger
-from src.workflow.state import WorkflowState
+from src.workflow.semantic_cache import SemanticCache, normalize
+from src.workflow.state import ExtractedEntities, ReviewResult, WorkflowState
 from src.workflow.tools import get_customer_history, search_knowledge_base
 
 logger = get_logger(__name__)
 
 settings = get_settings()
 
-llm = ChatOpenAI(
-    model="gpt-4o-mini",
+# Short, constrained tasks run on the smaller model; drafting and review
+# keep the larger one
+MODEL_FOR_NODE = {
+    "classify": "gpt-4.1-nano",
+    "extract": "gpt-4.1-nano",
+    "draft": "gpt-4o-mini",
+    "review": "gpt-4o-mini",
+}
+
+_chat_models: dict[str, ChatOpenAI] = {
+    model: ChatOpenAI(
+        model=model,
+        api_key=settings.openai_api_key,
+        timeout=settings.llm_timeout_seconds,
+    )
+    for model in set(MODEL_FOR_NODE.values())
+}
+
+classify_llm = _chat_models[MODEL_FOR_NODE["classify"]]
+entity_extractor = _chat_models[MODEL_FOR_NODE["extract"]].with_structured_output(
+    ExtractedEntities
+)
+llm = _chat_models[MODEL_FOR_NODE["draft"]]
+review_assessor = _chat_models[MODEL_FOR_NODE["review"]].with_structured_output(ReviewResult)
+
+embeddings = OpenAIEmbeddings(
+    model=settings.embedding_model,
     api_key=settings.openai_api_key,
     timeout=settings.llm_timeout_seconds,
 )
 
-
-def classify_node(state: WorkflowState) -> dict[str, Any]:
+# Previously classified tickets, so rephrasings of the same intent skip the LLM
+classification_cache = SemanticCache(threshold=settings.classify_cache_threshold)
+if settings.classify_cache_path:
+    classification_cache.load(settings.classify_cache_path)
+    atexit.register(classification_cache.save, settings.classify_cache_path)
+
+# Category descriptions, used both in the LLM prompt and as zero-shot
+# embedding targets
+CATEGORY_DESCRIPTIONS = {
+    "billing": "Payment issues, refunds, subscription problems",
+    "technical": "Product bugs, errors, functionality issues",
+    "account": "Login problems, password resets, account settings",
+    "general": "Questions, feedback, other inquiries",
+}
+
+# Shared opening message for every LLM step on a ticket. Each node appends
+# only its own instruction, so the ticket text is a common prefix that
+# OpenAI's prompt cache can reuse across the pipeline's calls.
+TICKET_CONTEXT_TEMPLATE = """You are a customer support assistant working through a single support ticket in several steps: classification, entity extraction, drafting a reply and reviewing that reply. Each step's instructions follow as a separate message; answer only what that step asks.
+
+## Ticket
+Subject: {subject}
+Body: {body}"""
+
+
+def _ticket_messages(state: WorkflowState, instruction: str) -> list[BaseMessage]:
+    """Build a node's prompt as the shared ticket context plus its instruction."""
+    context = TICKET_CONTEXT_TEMPLATE.format(subject=state["subject"], body=state["body"])
+    return [SystemMessage(content=context), HumanMessage(content=instruction)]
+
+
+# Normalized embeddings of the category descriptions, computed on first use.
+# The lock keeps concurrent first calls from each embedding the descriptions.
+_category_vectors: dict[str, list[float]] | None = None
+_category_vectors_lock = asyncio.Lock()
+
+
+async def _zero_shot_classify(vector: list[float]) -> tuple[str, float, float]:
+    """Return the category closest to vector, its score and its lead over the runner-up."""
+    global _category_vectors
+    if _category_vectors is None:
+        async with _category_vectors_lock:
+            if _category_vectors is None:
+                descriptions = [
+                    f"{name}: {desc}" for name, desc in CATEGORY_DESCRIPTIONS.items()
+                ]
+                vectors = await embeddings.aembed_documents(descriptions)
+                _category_vectors = dict(zip(CATEGORY_DESCRIPTIONS, map(normalize, vectors)))
+
+    query = normalize(vector)
+    (label, best), (_, second) = sorted(
+        ((name, sum(a * b for a, b in zip(query, v))) for name, v in _category_vectors.items()),
+        key=lambda item: item[1],
+        reverse=True,
+    )[:2]
+    return label, best, best - second
+
+
+async def classify_node(state: WorkflowState) -> dict[str, Any]:
     """Classify the ticket into a category."""
-    logger.info("node_classify", ticket_id=state.ticket_id)
+    logger.info("node_classify", ticket_id=state["ticket_id"])
 
-    prompt = f"""Classify this customer support ticket into exactly one category.
+    # The cache is best-effort; an embedding failure just means an LLM call
+    try:
+        vector = await embeddings.aembed_query(f"{state['subject']}\n{state['body']}")
+    except Exception as e:
+        logger.warning("node_classify_embedding_error", error=str(e))
+        vector = None
+
+    if vector is not None:
+        # Without faiss the lookup is a pure-Python scan of every entry; keep
+        # it off the shared event loop
+        cached = await asyncio.to_thread(classification_cache.lookup, vector)
+        if cached is not None:
+            logger.info("node_classify_cache_hit", classification=cached)
+            return {"classification": cached}
+
+        # Zero-shot against the category descriptions; the LLM only handles
+        # tickets that aren't clearly close to one category
+        try:
+            label, score, margin = await _zero_shot_classify(vector)
+        except Exception as e:
+            logger.warning("node_classify_zero_shot_error", error=str(e))
+        else:
+            # A near tie between two categories is ambiguous however high
+            # the top score is
+            if (
+                score >= settings.classify_zero_shot_threshold
+                and margin >= settings.classify_zero_shot_margin
+            ):
+                logger.info(
+                    "node_classify_zero_shot", classification=label, score=score, margin=margin
+                )
+                return {"classification": label}
+
+    categories = "\n".join(f"- {name}: {desc}" for name, desc in CATEGORY_DESCRIPTIONS.items())
+    prompt = _ticket_messages(
+        state,
+        f"""Classify this ticket into exactly one category.
 
 Categories:
-- billing: Payment issues, refunds, subscription problems
-- technical: Product bugs, errors, functionality issues
-- account: Login problems, password resets, account settings
-- general: Questions, feedback, other inquiries
-
-Ticket Subject: {state.subject}
-Ticket Body: {state.body}
+{categories}
 
-Respond with only the category name (billing, technical, account, or general)."""
+Respond with only the category name (billing, technical, account, or general).""",
+    )
 
-    response = llm.invoke(prompt)
+    response = await classify_llm.ainvoke(prompt)
     classification = response.content.strip().lower()
 
-    # Validate classification
-    valid_categories = ["billing", "technical", "account", "general"]
-    if classification not in valid_categories:
+    # Validate classification. A fallback label isn't the LLM's answer, so
+    # it isn't cached for similar tickets either.
+    if classification not in CATEGORY_DESCRIPTIONS:
+        logger.warning("node_classify_invalid_label", label=classification)
         classification = "general"
+    elif vector is not None:
+        classification_cache.add(vector, classification)
 
     logger.info("node_classify_complete", classification=classification)
-    return {"classification": classification, "current_step": "classify"}
+    # classify, extract and research run in parallel, so only the join
+    # downstream (draft) sets current_step
+    return {"classification": classification}
 
 
-def extract_node(state: WorkflowState) -> dict[str, Any]:
+async def extract_node(state: WorkflowState) -> dict[str, Any]:
     """Extract key entities from the ticket."""
-    logger.info("node_extract", ticket_id=state.ticket_id)
+    logger.info("node_extract", ticket_id=state["ticket_id"])
 
-    prompt = f"""Extract key entities from this customer support ticket.
+    prompt = _ticket_messages(state, "Extract key entities from this ticket.")
 
-Ticket Subject: {state.subject}
-Ticket Body: {state.body}
-
-Extract the following if present (respond with JSON):
-- order_id: Any order or transaction ID mentioned
-- product: Product or service name mentioned
-- issue_type: Brief description of the issue type
-- urgency: low, medium, or high based on tone and content
-
-Respond with valid JSON only."""
-
-    response = llm.invoke(prompt)
-
-    # Parse JSON from response
+    # Structured output returns schema-conformant fields, no JSON parsing.
+    # Entities are optional context, so a failed extraction falls back to
+    # defaults rather than failing the ticket.
     try:
-        import json
-        content = response.content.strip()
-        # Handle markdown code blocks
-        if content.startswith("```"):
-            content = re.sub(r"```json?\n?", "", content)
-            content = content.replace("```", "")
-        entities = json.loads(content)
-    except Exception:
-        entities = {
-            "order_id": None,
-            "product": None,
-            "issue_type": "unknown",
-            "urgency": "medium",
-        }
+        extracted = await entity_extractor.ainvoke(prompt)
+    except Exception as e:
+        logger.warning("node_extract_error", error=str(e))
+        extracted = ExtractedEntities(issue_type="unknown", urgency="medium")
+    entities = extracted.model_dump()
 
     logger.info("node_extract_complete", entities=entities)
-    return {"entities": entities, "current_step": "extract"}
+    return {"entities": entities}
 
 
-def research_node(state: WorkflowState) -> dict[str, Any]:
+async def research_node(state: WorkflowState) -> dict[str, Any]:
     """Research relevant information for the ticket."""
-    logger.info("node_research", ticket_id=state.ticket_id)
+    logger.info("node_research", ticket_id=state["ticket_id"])
 
     results = []
 
-    # Search knowledge base
-    query = f"{state.classification} {state.subject}"
-    kb_results = search_knowledge_base(query)
+    # Knowledge base search and customer history are independent lookups,
+    # so run them concurrently. research runs alongside classify, so the KB
+    # query comes from the ticket itself rather than its classification.
+    query = f"{state['subject']} {state['body']}"
+    kb_results, history = await asyncio.gather(
+        search_knowledge_base(query),
+        get_customer_history.ainvoke({"customer_id": state["customer_id"]}),
+    )
     results.extend([{"source": "knowledge_base", **r} for r in kb_results])
 
-    # Get customer history
-    history = get_customer_history(state.customer_id)
-    if history:
+    tickets = history.get("tickets") or []
+    if tickets:
         results.append({
             "source": "customer_history",
-            "previous_tickets": len(history),
-            "tickets": history,
+            "previous_tickets": len(tickets),
+            "tickets": tickets,
         })
 
     logger.info("node_research_complete", result_count=len(results))
-    return {"research_results": results, "current_step": "research"}
+    return {"research_results": results}
 
 
-def draft_node(state: WorkflowState) -> dict[str, Any]:
+async def draft_node(state: WorkflowState) -> dict[str, Any]:
     """Generate a draft response."""
-    logger.info("node_draft", ticket_id=state.ticket_id)
+    logger.info("node_draft", ticket_id=state["ticket_id"])
 
     research_context = ""
-    if state.research_results:
-        for r in state.research_results:
+    research_results = state.get("research_results")
+    if research_results:
+        for r in research_results:
             if r.get("source") == "knowledge_base":
                 research_context += f"- {r.get('title', '')}: {r.get('content', '')}\n"
 
-    prompt = f"""Write a helpful customer support response for this ticket.
+    prompt = _ticket_messages(
+        state,
+        f"""Write a helpful customer support response for this ticket.
 
-Category: {state.classification}
-Subject: {state.subject}
-Body: {state.body}
+Category: {state.get('classification')}
 
 Extracted Information:
-{state.entities}
+{state.get('entities')}
 
 Relevant Knowledge Base Articles:
 {research_context}
 
 Write a professional, empathetic response that addresses the customer's concern.
-Be specific and actionable. Do not make up information."""
+Be specific and actionable. Do not make up information.""",
+    )
 
-    response = llm.invoke(prompt)
-    draft = response.content.strip()
+    # Streamed so callers of astream_events see tokens as they're generated
+    # (see graph.stream_draft); the node itself still returns the full draft
+    chunks = [chunk.content async for chunk in llm.astream(prompt)]
+    draft = "".join(chunks).strip()
 
     logger.info("node_draft_complete", draft_length=len(draft))
     return {"draft_response": draft, "current_step": "draft"}
 
 
-def review_node(state: WorkflowState) -> dict[str, Any]:
+async def review_node(state: WorkflowState) -> dict[str, Any]:
     """Self-review the draft response."""
-    logger.info("node_review", ticket_id=state.ticket_id)
-
-    prompt = f"""Review this customer support response for quality and policy compliance.
+    logger.info("node_review", ticket_id=state["ticket_id"])
 
-Original Ticket:
-Subject: {state.subject}
-Body: {state.body}
+    prompt = _ticket_messages(
+        state,
+        f"""Review this draft response to the ticket for quality and policy compliance.
 
 Draft Response:
-{state.draft_response}
+{state.get('draft_response')}
 
 Check for:
 1. Does it address the customer's actual concern?
@@ -163,22 +270,27 @@ Check for:
 3. Are there any promises that shouldn't be made?
 4. Is the information accurate based on the context provided?
 
-Provide brief review notes (2-3 sentences) on what's good and any concerns."""
+Give brief review notes (2-3 sentences) on what's good and any concerns. Approve \
+the draft if it can be sent as written; otherwise provide a corrected response.""",
+    )
 
-    response = llm.invoke(prompt)
-    review_notes = response.content.strip()
+    review = await review_assessor.ainvoke(prompt)
 
-    logger.info("node_review_complete")
-    return {"review_notes": review_notes, "current_step": "review"}
+    logger.info("node_review_complete", approved=review.approved)
+    return {
+        "review_notes": review.notes,
+        "review_approved": review.approved,
+        "revised_response": None if review.approved else review.revised,
+        "current_step": "review",
+    }
 
 
-def finalize_node(state: WorkflowState) -> dict[str, Any]:
+async def finalize_node(state: WorkflowState) -> dict[str, Any]:
     """Finalize the response."""
-    logger.info("node_finalize", ticket_id=state.ticket_id)
+    logger.info("node_finalize", ticket_id=state["ticket_id"])
 
-    # If review notes indicate issues, we could refine here
-    # For now, use the draft as final
-    final_response = state.draft_response
+    # Send the reviewer's correction when the draft wasn't approved
+    final_response = state.get("revised_response") or state.get("draft_response")
 
     logger.info("node_finalize_complete")
     return {"final_response": final_response, "current_step": "finalize"}
@@ -0,0 +1,94 @@
+"""
+Semantic cache for short LLM classifications.
+
+Maps ticket embeddings to the label the LLM gave them, so rephrasings of an
+already-seen ticket ("can't log in", "password won't work") skip the call.
+"""
+
+import math
+import threading
+from collections.abc import Sequence
+from pathlib import Path
+
+from src.common.logging import get_logger
+from src.common.serialization import dumps, loads
+
+try:
+    import faiss
+    import numpy as np
+except ImportError:  # pragma: no cover - exercised only without the semantic-cache extra
+    faiss = None
+
+logger = get_logger(__name__)
+
+
+def normalize(vector: Sequence[float]) -> list[float]:
+    """L2-normalize vector so inner products are cosine similarities."""
+    norm = math.sqrt(sum(x * x for x in vector)) or 1.0
+    return [x / norm for x in vector]
+
+
+class SemanticCache:
+    """
+    Nearest-neighbour lookup from embeddings to labels by cosine similarity.
+
+    Vectors are L2-normalized so inner product equals cosine. Uses a FAISS
+    flat inner-product index when faiss is installed, otherwise a linear scan.
+    """
+
+    def __init__(self, threshold: float, max_entries: int = 10_000):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self._vectors: list[list[float]] = []
+        self._labels: list[str] = []
+        self._index = None
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._labels)
+
+    def lookup(self, vector: Sequence[float]) -> str | None:
+        """Return the label of the nearest entry if it's similar enough."""
+        query = normalize(vector)
+        with self._lock:
+            if not self._labels:
+                return None
+            if self._index is not None:
+                scores, ids = self._index.search(np.array([query], dtype="float32"), 1)
+                score, best = float(scores[0][0]), int(ids[0][0])
+            else:
+                score, best = max(
+                    (sum(a * b for a, b in zip(query, v)), i)
+                    for i, v in enumerate(self._vectors)
+                )
+            return self._labels[best] if score >= self.threshold else None
+
+    def add(self, vector: Sequence[float], label: str) -> None:
+        """Remember label for vector. Entries beyond max_entries are dropped."""
+        normalized = normalize(vector)
+        with self._lock:
+            if len(self._labels) >= self.max_entries:
+                return
+            if faiss is not None:
+                if self._index is None:
+                    self._index = faiss.IndexFlatIP(len(normalized))
+                self._index.add(np.array([normalized], dtype="float32"))
+            self._vectors.append(normalized)
+            self._labels.append(label)
+
+    def save(self, path: str | Path) -> None:
+        """Write entries to path as JSON."""
+        with self._lock:
+            data = {"vectors": self._vectors, "labels": self._labels}
+        Path(path).write_bytes(dumps(data))
+        logger.info("semantic_cache_saved", path=str(path), entries=len(data["labels"]))
+
+    def load(self, path: str | Path) -> None:
+        """Add entries saved by save(), e.g. labeled historical tickets for a warm start."""
+        path = Path(path)
+        if not path.exists():
+            return
+        data = loads(path.read_bytes())
+        for vector, label in zip(data["vectors"], data["labels"]):
+            self.add(vector, label)
+        logger.info("semantic_cache_loaded", path=str(path), entries=len(self))
@@ -1,8 +1,7 @@
-from typing import Annotated, Any
+from typing import Any, Literal, TypedDict
 from uuid import UUID
 
-from langgraph.graph.message import add_messages
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 
 class TicketInput(BaseModel):
@@ -12,8 +11,34 @@ class TicketInput(BaseModel):
     body: str
 
 
-class WorkflowState(BaseModel):
-    """State schema for the ticket processing workflow."""
+class ExtractedEntities(BaseModel):
+    """Entities the extract step pulls out of a ticket."""
+
+    order_id: str | None = Field(None, description="Any order or transaction ID mentioned")
+    product: str | None = Field(None, description="Product or service name mentioned")
+    issue_type: str = Field(description="Brief description of the issue type")
+    urgency: Literal["low", "medium", "high"] = Field(
+        description="Urgency based on tone and content"
+    )
+
+
+class ReviewResult(BaseModel):
+    """Outcome of the review step on a draft response."""
+
+    approved: bool = Field(description="Whether the draft can be sent as written")
+    notes: str = Field(description="Brief review notes (2-3 sentences)")
+    revised: str | None = Field(
+        None, description="Corrected response when the draft is not approved"
+    )
+
+
+class WorkflowState(TypedDict, total=False):
+    """
+    State schema for the ticket processing workflow.
+
+    A TypedDict rather than a model so LangGraph merges node updates without
+    validating them; inputs are validated once at the boundary (TicketInput).
+    """
 
     # Input
     ticket_id: str
@@ -22,16 +47,15 @@ class WorkflowState(BaseModel):
     body: str
 
     # Processing results
-    classification: str | None = None
-    entities: dict[str, Any] | None = None
-    research_results: list[dict[str, Any]] | None = None
-    draft_response: str | None = None
-    review_notes: str | None = None
-    final_response: str | None = None
+    classification: str | None
+    entities: dict[str, Any] | None
+    research_results: list[dict[str, Any]] | None
+    draft_response: str | None
+    review_notes: str | None
+    review_approved: bool | None
+    revised_response: str | None
+    final_response: str | None
 
     # Tracking
-    current_step: str = "start"
-    error: str | None = None
-
-    class Config:
-        arbitrary_types_allowed = True
+    current_step: str
+    error: str | None
@@ -5,22 +5,89 @@ These tools allow the AI agent to take real actions like querying databases,
 processing refunds, creating bug reports, and more.
 """
 
+import asyncio
+import re
+import secrets
+import threading
+import time
+from collections import deque
+from collections.abc import Awaitable, Callable
 from typing import Any
-from uuid import uuid4
 
-from langchain_core.tools import tool
+from cachetools import LFUCache, TTLCache
+from langchain_core.tools import BaseTool, tool
 
+from src.common.config import get_settings
 from src.common.logging import get_logger
-from src.db.client import get_supabase_client
+from src.db.client import get_async_supabase_client
 
 logger = get_logger(__name__)
 
+settings = get_settings()
+
+# Help articles and products are read-mostly and the same lookups repeat
+# across tickets. Only successful results are cached.
+_help_cache: TTLCache = TTLCache(maxsize=512, ttl=settings.tool_cache_ttl_seconds)
+# LFU keeps hot SKUs resident under skewed traffic; entries carry their own
+# expiry so price and stock changes still show up
+_product_cache: LFUCache = LFUCache(maxsize=1024)
+_cache_lock = threading.Lock()
+
+# Customer IDs look like 'cust_john_doe'; anything with an @ is an email
+_CUSTOMER_ID_RE = re.compile(r"^cust_\w+$")
+# Addresses reset_password will send to: one @, a dotted domain, no spaces
+_EMAIL_RE = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+
+# Random hex IDs drawn in batches, one CSPRNG read per 1024 IDs
+_ID_BATCH_SIZE = 1024
+_id_pool: deque[str] = deque()
+_id_lock = threading.Lock()
+
+# Lookups currently running, keyed by tool and normalized arguments, so
+# identical concurrent calls share one query
+_inflight: dict[tuple, asyncio.Task] = {}
+
+# Strong references to fire-and-forget tasks so they aren't collected mid-run
+_background_tasks: set[asyncio.Task] = set()
+
+# How long shutdown waits for fire-and-forget tasks before abandoning them
+BACKGROUND_DRAIN_TIMEOUT = 10.0
+
+
+async def drain_background_tasks(timeout: float = BACKGROUND_DRAIN_TIMEOUT) -> None:
+    """Wait up to timeout for pending fire-and-forget tasks, e.g. before shutdown."""
+    if not _background_tasks:
+        return
+    _, pending = await asyncio.wait(set(_background_tasks), timeout=timeout)
+    if pending:
+        logger.warning("background_tasks_abandoned", count=len(pending))
+
+
+def _fresh_id(length: int) -> str:
+    """Return a random hex string of up to 16 characters from the shared pool."""
+    with _id_lock:
+        if not _id_pool:
+            batch = secrets.token_hex(8 * _ID_BATCH_SIZE)
+            _id_pool.extend(batch[i : i + 16] for i in range(0, len(batch), 16))
+        return _id_pool.popleft()[:length]
+
+
+async def _singleflight(key: tuple, fetch: Callable[[], Awaitable[Any]]) -> Any:
+    """Await fetch(), or join an identical fetch that is already in flight."""
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(fetch())
+        _inflight[key] = task
+        task.add_done_callback(lambda _: _inflight.pop(key, None))
+    # Shielded so one caller's cancellation doesn't cancel the shared query
+    return await asyncio.shield(task)
+
 
 # --- Information Tools ---
 
 
 @tool
-def query_help_articles(
+async def query_help_articles(
     category: str | None = None,
     search_term: str | None = None
 ) -> dict[str, Any]:
@@ -39,22 +106,41 @@ def query_help_articles(
     """
     logger.info("tool_query_help_articles", category=category, search_term=search_term)
 
-    try:
-        client = get_supabase_client()
-        query = client.table("help_articles").select("id, title, content, category, keywords")
+    key = (category, (search_term or "").lower().strip())
+    with _cache_lock:
+        cached = _help_cache.get(key)
+    if cached is not None:
+        return cached
+
+    return await _singleflight(
+        ("query_help_articles", key), lambda: _fetch_help_articles(category, search_term, key)
+    )
 
-        # Apply category filter if provided
-        if category:
-            query = query.eq("category", category)
 
-        # Apply text search if provided
+async def _fetch_help_articles(
+    category: str | None, search_term: str | None, key: tuple
+) -> dict[str, Any]:
+    """Query help articles and cache a successful result under key."""
+    try:
+        client = get_async_supabase_client()
+
         if search_term:
-            # Search in title and content using ilike
-            query = query.or_(
-                f"title.ilike.%{search_term}%,content.ilike.%{search_term}%"
+            # Full-text search over title and content, best matches first
+            # (see migrations/011_help_articles_fts.sql)
+            query = client.rpc(
+                "search_help_articles",
+                {"p_query": search_term, "p_category": category, "p_limit": 5},
             )
+        else:
+            query = client.table("help_articles").select("id, title, content, category, keywords")
+
+            # Apply category filter if provided
+            if category:
+                query = query.eq("category", category)
+
+            query = query.limit(5)
 
-        result = query.limit(5).execute()
+        result = await query.execute()
 
         articles = [
             {
@@ -65,13 +151,16 @@ def query_help_articles(
             for article in result.data
         ]
 
-        return {
+        response = {
             "success": True,
             "articles": articles,
             "count": len(articles),
             "category_filter": category,
             "search_term": search_term,
         }
+        with _cache_lock:
+            _help_cache[key] = response
+        return response
 
     except Exception as e:
         logger.error("tool_query_help_articles_error", error=str(e))
@@ -79,7 +168,7 @@ def query_help_articles(
 
 
 @tool
-def check_order_status(order_id: str) -> dict[str, Any]:
+async def check_order_status(order_id: str) -> dict[str, Any]:
     """
     Look up the current status of a customer order from the database.
 
@@ -98,26 +187,26 @@ def check_order_status(order_id: str) -> dict[str, Any]:
         return {"success": False, "error": "Order ID is required"}
 
     try:
-        client = get_supabase_client()
-
-        # Get order with customer info
-        order_result = client.table("orders").select(
-            "*, customers(id, name, email, tier)"
-        ).eq("id", order_id).execute()
-
-        if not order_result.data:
+        client = get_async_supabase_client()
+
+        # Get the order with its customer and line items in one request,
+        # selecting only the fields returned below. maybe_single() yields
+        # None rather than an error when the order doesn't exist.
+        order_result = await client.table("orders").select(
+            "id, status, total, tracking_number, carrier, estimated_delivery, "
+            "shipping_address, created_at, shipped_at, delivered_at, "
+            "customers(id, name, email, tier), "
+            "order_items(product_name, quantity, unit_price, subtotal)"
+        ).eq("id", order_id).maybe_single().execute()
+
+        if order_result is None or not order_result.data:
             return {
                 "success": False,
                 "error": f"Order {order_id} not found",
                 "order": None
             }
 
-        order = order_result.data[0]
-
-        # Get order items
-        items_result = client.table("order_items").select(
-            "product_name, quantity, unit_price, subtotal"
-        ).eq("order_id", order_id).execute()
+        order = order_result.data
 
         items = [
             {
@@ -126,7 +215,7 @@ def check_order_status(order_id: str) -> dict[str, Any]:
                 "price": float(item["unit_price"]),
                 "subtotal": float(item["subtotal"])
             }
-            for item in items_result.data
+            for item in order.get("order_items") or []
         ]
 
         return {
@@ -153,60 +242,61 @@ def check_order_status(order_id: str) -> dict[str, Any]:
 
 
 @tool
-def get_customer_history(customer_id: str) -> dict[str, Any]:
+async def get_customer_history(customer_id: str, cursor: str | None = None) -> dict[str, Any]:
     """
     Fetch complete customer information including orders and support history.
 
     Use this tool to understand a customer's full history for context-aware support.
+    Returns the 5 most recent tickets and orders; pass the returned next_cursor
+    back as cursor to page further into the history.
 
     Args:
         customer_id: The customer ID or email to look up.
+        cursor: Optional next_cursor from a previous call, to fetch older entries.
 
     Returns:
-        A dict with customer details, order history, and previous tickets.
+        A dict with customer details, order history, previous tickets, and
+        next_cursor (None when there is nothing older).
     """
-    logger.info("tool_get_customer_history", customer_id=customer_id)
+    logger.info("tool_get_customer_history", customer_id=customer_id, cursor=cursor)
 
     try:
-        client = get_supabase_client()
-
-        # Try to find customer by ID or email
-        customer_result = client.table("customers").select("*").or_(
-            f"id.eq.{customer_id},email.eq.{customer_id}"
+        client = get_async_supabase_client()
+
+        # Look the customer up by a single indexed column when the identifier's
+        # shape says which one; None falls back to matching either
+        if _CUSTOMER_ID_RE.match(customer_id):
+            lookup = "id"
+        elif "@" in customer_id:
+            lookup = "email"
+        else:
+            lookup = None
+
+        # Customer, last 5 tickets and last 5 orders (before cursor) in one
+        # round trip (see migrations/010, 012 and 013)
+        result = await client.rpc(
+            "get_customer_bundle",
+            {"p_id": customer_id, "p_lookup": lookup, "p_before": cursor},
         ).execute()
+        bundle = result.data or {}
+        tickets = bundle.get("tickets") or []
 
-        customer = customer_result.data[0] if customer_result.data else None
+        # Only a full page can have older entries. Resume from the newest of
+        # the full pages' oldest entries, so the longer history never skips
+        # rows (the shorter one may repeat a few).
+        full_pages = [rows for rows in (tickets, bundle.get("orders") or []) if len(rows) == 5]
+        next_cursor = max((rows[-1]["created_at"] for rows in full_pages), default=None)
 
-        # Get previous tickets
-        tickets_result = (
-            client.table("tickets")
-            .select("id, subject, status, created_at")
-            .eq("customer_id", customer_id)
-            .order("created_at", desc=True)
-            .limit(5)
-            .execute()
-        )
-
-        # Get recent orders if customer found
-        orders = []
-        if customer:
-            orders_result = (
-                client.table("orders")
-                .select("id, status, total, created_at")
-                .eq("customer_id", customer["id"])
-                .order("created_at", desc=True)
-                .limit(5)
-                .execute()
-            )
-            orders = [
-                {
-                    "order_id": o["id"],
-                    "status": o["status"],
-                    "total": float(o["total"]),
-                    "created_at": o["created_at"]
-                }
-                for o in orders_result.data
-            ]
+        customer = bundle.get("customer")
+        orders = [
+            {
+                "order_id": o["id"],
+                "status": o["status"],
+                "total": float(o["total"]),
+                "created_at": o["created_at"]
+            }
+            for o in bundle.get("orders") or []
+        ]
 
         return {
             "success": True,
@@ -217,9 +307,10 @@ def get_customer_history(customer_id: str) -> dict[str, Any]:
                 "tier": customer["tier"] if customer else "unknown",
                 "lifetime_value": float(customer["lifetime_value"]) if customer else 0,
             } if customer else None,
-            "tickets": tickets_result.data,
+            "tickets": tickets,
             "orders": orders,
             "customer_id": customer_id,
+            "next_cursor": next_cursor,
         }
 
     except Exception as e:
@@ -228,7 +319,7 @@ def get_customer_history(customer_id: str) -> dict[str, Any]:
 
 
 @tool
-def lookup_product(
+async def lookup_product(
     product_id: str | None = None,
     name_search: str | None = None
 ) -> dict[str, Any]:
@@ -250,8 +341,23 @@ def lookup_product(
     if not product_id and not name_search:
         return {"success": False, "error": "Either product_id or name_search is required"}
 
+    key = (product_id, (name_search or "").lower().strip())
+    with _cache_lock:
+        entry = _product_cache.get(key)
+    if entry is not None and entry[0] > time.monotonic():
+        return entry[1]
+
+    return await _singleflight(
+        ("lookup_product", key), lambda: _fetch_products(product_id, name_search, key)
+    )
+
+
+async def _fetch_products(
+    product_id: str | None, name_search: str | None, key: tuple
+) -> dict[str, Any]:
+    """Query products and cache a successful result under key."""
     try:
-        client = get_supabase_client()
+        client = get_async_supabase_client()
         query = client.table("products").select("*")
 
         if product_id:
@@ -259,7 +365,7 @@ def lookup_product(
         elif name_search:
             query = query.ilike("name", f"%{name_search}%")
 
-        result = query.limit(5).execute()
+        result = await query.limit(5).execute()
 
         if not result.data:
             return {
@@ -280,11 +386,14 @@ def lookup_product(
             for p in result.data
         ]
 
-        return {
+        response = {
             "success": True,
             "products": products,
             "count": len(products)
         }
+        with _cache_lock:
+            _product_cache[key] = (time.monotonic() + settings.tool_cache_ttl_seconds, response)
+        return response
 
     except Exception as e:
         logger.error("tool_lookup_product_error", error=str(e))
@@ -295,7 +404,7 @@ def lookup_product(
 
 
 @tool
-def reset_password(user_email: str) -> dict[str, Any]:
+async def reset_password(user_email: str) -> dict[str, Any]:
     """
     Send a password reset email to the user.
 
@@ -310,11 +419,11 @@ def reset_password(user_email: str) -> dict[str, Any]:
     """
     logger.info("tool_reset_password", user_email=user_email)
 
-    if not user_email or "@" not in user_email:
+    if not user_email or not _EMAIL_RE.match(user_email):
         return {"success": False, "error": "Valid email address is required"}
 
     # Mock implementation - in production, integrate with auth system
-    reset_token = str(uuid4())[:8]
+    reset_token = _fresh_id(8)
 
     logger.info(
         "password_reset_initiated",
@@ -334,7 +443,7 @@ def reset_password(user_email: str) -> dict[str, Any]:
 
 
 @tool
-def process_refund(order_id: str, amount: float, reason: str) -> dict[str, Any]:
+async def process_refund(order_id: str, amount: float, reason: str) -> dict[str, Any]:
     """
     Process a refund for a customer order.
 
@@ -366,13 +475,19 @@ def process_refund(order_id: str, amount: float, reason: str) -> dict[str, Any]:
 
     # Verify the order exists
     try:
-        client = get_supabase_client()
-        order_result = client.table("orders").select("id, total, status").eq("id", order_id).execute()
+        client = get_async_supabase_client()
+        order_result = await (
+            client.table("orders")
+            .select("id, total, status")
+            .eq("id", order_id)
+            .maybe_single()
+            .execute()
+        )
 
-        if not order_result.data:
+        if order_result is None or not order_result.data:
             return {"success": False, "error": f"Order {order_id} not found"}
 
-        order = order_result.data[0]
+        order = order_result.data
         if amount > float(order["total"]):
             return {"success": False, "error": f"Refund amount exceeds order total of ${order['total']}"}
 
@@ -381,7 +496,7 @@ def process_refund(order_id: str, amount: float, reason: str) -> dict[str, Any]:
         # Continue with refund even if verification fails
 
     # Mock implementation - in production, integrate with Stripe or payment provider
-    refund_id = f"ref_{uuid4().hex[:12]}"
+    refund_id = f"ref_{_fresh_id(12)}"
 
     logger.info(
         "refund_processed",
@@ -405,7 +520,7 @@ def process_refund(order_id: str, amount: float, reason: str) -> dict[str, Any]:
 
 
 @tool
-def create_bug_report(
+async def create_bug_report(
     title: str, description: str, priority: str = "medium"
 ) -> dict[str, Any]:
     """
@@ -413,7 +528,7 @@ def create_bug_report(
 
     Use this tool when a customer reports a technical problem, bug, or
     system error that needs to be investigated by the engineering team.
-    If GitHub is configured, this creates a real GitHub issue.
+    If GitHub is configured, a GitHub issue is also filed in the background.
 
     Args:
         title: Brief title describing the bug.
@@ -436,26 +551,7 @@ def create_bug_report(
     if priority not in ["low", "medium", "high", "critical"]:
         return {"success": False, "error": "Invalid priority level"}
 
-    # Try to create GitHub issue if configured
-    try:
-        from src.services.github import create_github_issue
-        result = create_github_issue(title, description, priority)
-
-        if result.get("success"):
-            return {
-                "success": True,
-                "issue_number": result.get("issue_number"),
-                "issue_url": result.get("issue_url"),
-                "title": title,
-                "priority": priority,
-                "status": "open",
-                "message": f"Bug report created: {result.get('issue_url')}",
-            }
-    except Exception as e:
-        logger.warning("github_integration_failed", error=str(e))
-
-    # Fallback to local ID if GitHub not configured or fails
-    bug_id = f"BUG-{uuid4().hex[:6].upper()}"
+    bug_id = f"BUG-{_fresh_id(6).upper()}"
 
     logger.info(
         "bug_report_created",
@@ -464,6 +560,12 @@ def create_bug_report(
         priority=priority,
     )
 
+    # Filing the GitHub issue is a slow external round trip; the agent only
+    # needs the bug ID, so the issue is created in the background
+    task = asyncio.create_task(_file_github_issue(bug_id, title, description, priority))
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
     return {
         "success": True,
         "bug_id": bug_id,
@@ -475,11 +577,30 @@ def create_bug_report(
     }
 
 
+async def _file_github_issue(bug_id: str, title: str, description: str, priority: str) -> None:
+    """Create the GitHub issue for a bug report, if GitHub is configured."""
+    try:
+        from src.services.github import create_github_issue
+        # The GitHub client is sync; keep it off the event loop
+        result = await asyncio.to_thread(create_github_issue, title, description, priority)
+    except Exception as e:
+        logger.warning("github_integration_failed", bug_id=bug_id, error=str(e))
+        return
+
+    if result.get("success"):
+        logger.info(
+            "bug_report_github_linked",
+            bug_id=bug_id,
+            issue_number=result.get("issue_number"),
+            issue_url=result.get("issue_url"),
+        )
+
+
 # --- Escalation Tools ---
 
 
 @tool
-def escalate_to_human(reason: str, suggested_action: str) -> dict[str, Any]:
+async def escalate_to_human(reason: str, suggested_action: str) -> dict[str, Any]:
     """
     Escalate the ticket to a human support agent for review.
 
@@ -505,7 +626,7 @@ def escalate_to_human(reason: str, suggested_action: str) -> dict[str, Any]:
     if not reason:
         return {"success": False, "error": "Escalation reason is required"}
 
-    escalation_id = f"ESC-{uuid4().hex[:6].upper()}"
+    escalation_id = f"ESC-{_fresh_id(6).upper()}"
 
     logger.info(
         "ticket_escalated",
@@ -523,10 +644,59 @@ def escalate_to_human(reason: str, suggested_action: str) -> dict[str, Any]:
     }
 
 
+# --- Pipeline Helpers ---
+
+
+# Distinct words from a ticket ORed into one full-text query, so an article
+# matching any of them can rank; capped to keep the tsquery small
+_KB_QUERY_WORD_RE = re.compile(r"[a-zA-Z]{3,}")
+_KB_QUERY_MAX_WORDS = 32
+_KB_RESULT_LIMIT = 3
+
+
+async def search_knowledge_base(query: str) -> list[dict[str, Any]]:
+    """
+    Search the help articles for ones relevant to a ticket.
+
+    Used by the legacy pipeline's research step. Runs the ranked full-text
+    search from migrations/011_help_articles_fts.sql with the ticket's words
+    ORed together. Returns no articles on failure rather than made-up ones,
+    since the results are quoted in customer replies.
+    """
+    logger.info("search_knowledge_base", query_length=len(query))
+
+    words = list(dict.fromkeys(w.lower() for w in _KB_QUERY_WORD_RE.findall(query)))
+    if not words:
+        return []
+
+    try:
+        client = get_async_supabase_client()
+        result = await client.rpc(
+            "search_help_articles",
+            {
+                "p_query": " or ".join(words[:_KB_QUERY_MAX_WORDS]),
+                "p_category": None,
+                "p_limit": _KB_RESULT_LIMIT,
+            },
+        ).execute()
+    except Exception as e:
+        logger.error("search_knowledge_base_error", error=str(e))
+        return []
+
+    return [
+        {
+            "title": article["title"],
+            "content": article["content"],
+            "relevance": article["rank"],
+        }
+        for article in result.data or []
+    ]
+
+
 # --- Tool Registry ---
 
 # Tools that can execute automatically
-AUTO_APPROVE_TOOLS = [
+AUTO_APPROVE_TOOLS = frozenset({
     "query_help_articles",
     "check_order_status",
     "get_customer_history",
@@ -534,12 +704,20 @@ AUTO_APPROVE_TOOLS = [
     "reset_password",
     "create_bug_report",
     "escalate_to_human",
-]
+})
 
 # Tools that require human approval before execution
-REQUIRES_APPROVAL_TOOLS = [
+REQUIRES_APPROVAL_TOOLS = frozenset({
     "process_refund",
-]
+})
+
+# Read-only tools, safe to run concurrently within one agent turn
+CONCURRENCY_SAFE_TOOLS = frozenset({
+    "query_help_articles",
+    "check_order_status",
+    "get_customer_history",
+    "lookup_product",
+})
 
 # All available tools for the agent
 ALL_TOOLS = [
@@ -553,12 +731,20 @@ ALL_TOOLS = [
     escalate_to_human,
 ]
 
+# Name -> tool, for constant-time dispatch of the model's tool calls
+TOOLS_BY_NAME: dict[str, BaseTool] = {t.name: t for t in ALL_TOOLS}
+
 
 def get_all_tools() -> list:
-    """Get all tools available to the agent."""
+    """Get all tools available to the agent. Returns the shared ALL_TOOLS list."""
     return ALL_TOOLS
 
 
 def requires_approval(tool_name: str) -> bool:
     """Check if a tool requires human approval."""
     return tool_name in REQUIRES_APPROVAL_TOOLS
+
+
+def is_concurrency_safe(tool_name: str) -> bool:
+    """Check if a tool can run concurrently with other tool calls."""
+    return tool_name in CONCURRENCY_SAFE_TOOLS
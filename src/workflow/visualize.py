@@ -3,18 +3,48 @@ Generate PNG visualization of the LangGraph workflow.
 
 Usage:
     python -m src.workflow.visualize [output_path]
+
+Rendered diagrams are cached under .cache/, keyed by a hash of graph.py, so
+warm runs don't build the graph (or import LangGraph, the LLM clients and
+the DB client) at all.
 """
 
+import hashlib
 import sys
 from pathlib import Path
 
-from src.workflow.graph import get_compiled_workflow
+# Anchored at the project root so every process and cwd shares one cache
+_CACHE_DIR = Path(__file__).resolve().parents[2] / ".cache"
+_GRAPH_SOURCE = Path(__file__).with_name("graph.py")
+
+
+def _cache_path(suffix: str) -> Path:
+    """Cache file for the current graph definition."""
+    digest = hashlib.blake2b(_GRAPH_SOURCE.read_bytes()).hexdigest()[:12]
+    return _CACHE_DIR / f"graph-{digest}{suffix}"
+
+
+def _get_graph():
+    """Build the drawable graph. Imported here so cache hits skip the graph subtree."""
+    from src.workflow.graph import get_compiled_workflow
+
+    return get_compiled_workflow().get_graph()
+
+
+def _write_cache(path: Path, data: bytes) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
 
 
 def generate_mermaid() -> str:
     """Generate Mermaid diagram syntax for the workflow."""
-    compiled = get_compiled_workflow()
-    return compiled.get_graph().draw_mermaid()
+    cached = _cache_path(".mmd")
+    if cached.exists():
+        return cached.read_text()
+
+    mermaid = _get_graph().draw_mermaid()
+    _write_cache(cached, mermaid.encode())
+    return mermaid
 
 
 def generate_png(output_path: str = "workflow_graph.png") -> str:
@@ -34,13 +64,18 @@ def generate_png(output_path: str = "workflow_graph.png") -> str:
     Returns:
         Path to the generated PNG file (or .mmd fallback)
     """
-    compiled = get_compiled_workflow()
-    graph = compiled.get_graph()
+    cached = _cache_path(".png")
+    if cached.exists():
+        Path(output_path).write_bytes(cached.read_bytes())
+        return output_path
+
+    graph = _get_graph()
 
     # Try different methods to generate PNG
     try:
         # Method 1: Use draw_mermaid_png (requires mermaid CLI or API)
         png_data = graph.draw_mermaid_png()
+        _write_cache(cached, png_data)
         Path(output_path).write_bytes(png_data)
         return output_path
     except Exception:
@@ -49,6 +84,7 @@ def generate_png(output_path: str = "workflow_graph.png") -> str:
     try:
         # Method 2: Use pygraphviz if available
         png_data = graph.draw_png()
+        _write_cache(cached, png_data)
         Path(output_path).write_bytes(png_data)
         return output_path
     except ImportError:
@@ -59,7 +95,7 @@ def generate_png(output_path: str = "workflow_graph.png") -> str:
 
     # Method 3: Fallback to Mermaid text file
     mermaid_path = output_path.replace(".png", ".mmd")
-    mermaid_content = graph.draw_mermaid()
+    mermaid_content = generate_mermaid()
     Path(mermaid_path).write_text(mermaid_content)
     print(f"Mermaid diagram saved to: {mermaid_path}")
     print("Render it at: https://mermaid.live")
@@ -78,21 +114,14 @@ def generate_ascii() -> str:
                     │    __start__    │
                     └────────┬────────┘
                              │
-                             ▼
-                    ┌─────────────────┐
-                    │    classify     │  Categorize ticket
-                    └────────┬────────┘
-                             │
-                             ▼
-                    ┌─────────────────┐
-                    │    extract      │  Extract entities
-                    └────────┬────────┘
-                             │
-                             ▼
-                    ┌─────────────────┐
-                    │    research     │  Query KB + history
-                    └────────┬────────┘
-                             │
+          ┌──────────────────┼──────────────────┐
+          ▼                  ▼                  ▼
+ ┌─────────────────┐┌─────────────────┐┌─────────────────┐
+ │    classify     ││    extract      ││    research     │
+ │   Categorize    ││ Extract entities││ Query KB + hist │
+ └────────┬────────┘└────────┬────────┘└────────┬────────┘
+          │                  │                  │
+          └──────────────────┼──────────────────┘
                              ▼
                     ┌─────────────────┐
                     │     draft       │  Generate response
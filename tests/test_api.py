@@ -46,6 +46,16 @@ class TestHealthEndpoint:
         assert "database" in data
         assert "queue" in data
 
+    def test_health_revalidates_with_etag(self, client, mock_supabase):
+        """Test a matching If-None-Match gets a bodyless 304."""
+        mock_supabase.table.return_value.select.return_value.limit.return_value.execute.return_value = MagicMock()
+
+        etag = client.head("/health").headers["etag"]
+        response = client.get("/health", headers={"If-None-Match": etag})
+
+        assert response.status_code == 304
+        assert response.content == b""
+
 
 class TestTicketCreation:
     def test_create_ticket_returns_ticket_id(self, client, mock_supabase, mock_queue):
@@ -142,6 +152,30 @@ class TestTicketRetrieval:
 
         assert response.status_code == 404
 
+    def test_wait_returns_settled_ticket(self, client, mock_supabase):
+        """Test /wait re-reads the ticket until it settles."""
+        row = {
+            "id": "550e8400-e29b-41d4-a716-446655440000",
+            "customer_id": "cust1",
+            "subject": "Test",
+            "body": "Help",
+            "status": "processing",
+            "attempt_count": 1,
+            "created_at": "2024-01-01T00:00:00Z",
+        }
+        execute = mock_supabase.table.return_value.select.return_value.eq.return_value.execute
+        execute.side_effect = [
+            MagicMock(data=[row]),
+            MagicMock(data=[{**row, "status": "completed"}]),
+        ]
+
+        with patch("src.api.routes.WAIT_FIRST_INTERVAL", 0):
+            response = client.get("/tickets/550e8400-e29b-41d4-a716-446655440000/wait")
+
+        assert response.status_code == 200
+        assert response.json()["status"] == "completed"
+        assert execute.call_count == 2
+
 
 class TestMetrics:
     def test_metrics_endpoint_exists(self, client):
@@ -6,6 +6,11 @@ These tests require the full stack to be running:
 
 Run with:
     pytest tests/test_e2e.py -v -s
+
+The independent probes can run in parallel with pytest-xdist:
+    pytest tests/test_e2e.py -n auto --dist loadgroup
+Tests that drive tickets through the workers share one xdist group, so they
+stay on a single worker and don't contend with each other.
 """
 
 import time
@@ -18,13 +23,24 @@ BASE_URL = "http://localhost:8000"
 
 # Timeout for ticket processing (seconds)
 PROCESSING_TIMEOUT = 120
+# Polling backs off from the first interval to the ceiling
+FIRST_POLL_INTERVAL = 0.1
 POLL_INTERVAL = 2
+# Longest hold the /wait endpoint allows per request
+WAIT_TIMEOUT = 60
+# Statuses a ticket rests in once the worker is done with it
+SETTLED_STATUSES = ("completed", "failed_permanent", "awaiting_approval")
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def api_client():
-    """Create an HTTP client for API requests."""
-    with httpx.Client(base_url=BASE_URL, timeout=30.0) as client:
+    """HTTP client shared by the whole session, so tests reuse pooled connections."""
+    with httpx.Client(
+        base_url=BASE_URL,
+        timeout=30.0,
+        http2=True,
+        limits=httpx.Limits(max_keepalive_connections=20, max_connections=100),
+    ) as client:
         yield client
 
 
@@ -39,6 +55,44 @@ def unique_ticket_data():
     }
 
 
+def _wait_for_completion(api_client, ticket_id):
+    """Long-poll the ticket until it settles, falling back to polling without /wait."""
+    deadline = time.monotonic() + PROCESSING_TIMEOUT
+
+    # /wait holds each request for at most WAIT_TIMEOUT, so re-issue it
+    # until the ticket settles or the overall deadline passes
+    while True:
+        wait_for = max(min(WAIT_TIMEOUT, deadline - time.monotonic()), 1)
+        response = api_client.get(
+            f"/tickets/{ticket_id}/wait",
+            params={"timeout": wait_for},
+            timeout=wait_for + 5,
+        )
+        if response.status_code == 404:
+            break
+        assert response.status_code == 200
+
+        ticket_data = response.json()
+        if ticket_data["status"] in SETTLED_STATUSES or time.monotonic() >= deadline:
+            return ticket_data
+
+    interval = FIRST_POLL_INTERVAL
+    while True:
+        response = api_client.get(f"/tickets/{ticket_id}")
+        assert response.status_code == 200
+
+        ticket_data = response.json()
+        if (
+            ticket_data["status"] in SETTLED_STATUSES
+            or time.monotonic() >= deadline
+        ):
+            return ticket_data
+
+        print(f"[E2E] Status: {ticket_data['status']}, waiting...")
+        time.sleep(interval)
+        interval = min(interval * 1.7, POLL_INTERVAL)
+
+
 class TestHealthCheck:
     """Test that the system is healthy before running E2E tests."""
 
@@ -52,7 +106,18 @@ class TestHealthCheck:
         assert data["database"] == "healthy"
         assert data["queue"] == "healthy"
 
+    def test_health_probe_revalidates(self, api_client):
+        """Verify a HEAD probe's ETag makes the next check a bodyless 304."""
+        etag = api_client.head("/health").headers["etag"]
+
+        response = api_client.get("/health", headers={"If-None-Match": etag})
+        assert response.status_code in (200, 304)
+        if response.status_code == 200:
+            # Health changed between the two probes
+            assert response.json()["status"] in ("healthy", "unhealthy")
+
 
+@pytest.mark.xdist_group("ticket_processing")
 class TestFullTicketLifecycle:
     """Test the complete ticket processing lifecycle."""
 
@@ -62,7 +127,7 @@ class TestFullTicketLifecycle:
 
         Steps:
         1. POST /tickets - Create new ticket
-        2. GET /tickets/{id} - Poll until completed
+        2. GET /tickets/{id}/wait - Long-poll until completed
         3. Verify result structure
         4. GET /tickets/{id}/events - Verify all workflow steps
         """
@@ -78,24 +143,11 @@ class TestFullTicketLifecycle:
         assert create_data["status"] == "pending"
         print(f"[E2E] Ticket created: {ticket_id}")
 
-        # Step 2: Poll until completion
-        print(f"[E2E] Polling for completion (timeout: {PROCESSING_TIMEOUT}s)...")
+        # Step 2: Wait for completion
+        print(f"[E2E] Waiting for completion (timeout: {PROCESSING_TIMEOUT}s)...")
         start_time = time.time()
-        final_status = None
-        ticket_data = None
-
-        while time.time() - start_time < PROCESSING_TIMEOUT:
-            response = api_client.get(f"/tickets/{ticket_id}")
-            assert response.status_code == 200
-
-            ticket_data = response.json()
-            final_status = ticket_data["status"]
-
-            if final_status in ("completed", "failed_permanent"):
-                break
-
-            print(f"[E2E] Status: {final_status}, waiting...")
-            time.sleep(POLL_INTERVAL)
+        ticket_data = _wait_for_completion(api_client, ticket_id)
+        final_status = ticket_data["status"]
 
         elapsed = time.time() - start_time
         print(f"[E2E] Final status: {final_status} (took {elapsed:.1f}s)")
@@ -127,9 +179,9 @@ class TestFullTicketLifecycle:
         step_names = [e["step_name"] for e in step_events]
         print(f"[E2E] Completed steps: {step_names}")
 
-        expected_steps = ["classify", "extract", "research", "draft", "review", "finalize"]
-        for step in expected_steps:
-            assert step in step_names, f"Missing step: {step}"
+        expected_steps = {"classify", "extract", "research", "draft", "review", "finalize"}
+        missing = expected_steps - set(step_names)
+        assert not missing, f"Missing steps: {sorted(missing)}"
 
         print("[E2E] All workflow steps completed successfully!")
 
@@ -153,28 +205,18 @@ class TestFullTicketLifecycle:
 class TestTicketValidation:
     """Test input validation."""
 
-    def test_missing_subject_returns_422(self, api_client):
-        """Test that missing subject returns validation error."""
-        response = api_client.post(
-            "/tickets",
-            json={"body": "Test body", "customer_id": "cust1"},
-        )
-        assert response.status_code == 422
-
-    def test_missing_body_returns_422(self, api_client):
-        """Test that missing body returns validation error."""
-        response = api_client.post(
-            "/tickets",
-            json={"subject": "Test subject", "customer_id": "cust1"},
-        )
-        assert response.status_code == 422
-
-    def test_missing_customer_id_returns_422(self, api_client):
-        """Test that missing customer_id returns validation error."""
-        response = api_client.post(
-            "/tickets",
-            json={"subject": "Test subject", "body": "Test body"},
-        )
+    @pytest.mark.parametrize(
+        "payload",
+        [
+            {"body": "Test body", "customer_id": "cust1"},
+            {"subject": "Test subject", "customer_id": "cust1"},
+            {"subject": "Test subject", "body": "Test body"},
+        ],
+        ids=["missing_subject", "missing_body", "missing_customer_id"],
+    )
+    def test_missing_field_returns_422(self, api_client, payload):
+        """Test that a ticket missing a required field returns a validation error."""
+        response = api_client.post("/tickets", json=payload)
         assert response.status_code == 422
 
 
@@ -198,12 +240,23 @@ class TestMetrics:
 
     def test_metrics_returns_prometheus_format(self, api_client):
         """Test that /metrics returns Prometheus format."""
-        response = api_client.get("/metrics")
-        assert response.status_code == 200
+        markers = (b"tickets_created_total", b"http_request_duration")
+        found = False
 
-        content = response.text
-        # Check for expected metrics
-        assert "tickets_created_total" in content or "http_request_duration" in content
+        # Scan the body as it streams and stop at the first expected metric.
+        # Each chunk is searched together with the previous chunk's tail so a
+        # name split across chunks is still found.
+        with api_client.stream("GET", "/metrics") as response:
+            assert response.status_code == 200
+            tail = b""
+            for chunk in response.iter_bytes(8192):
+                window = tail + chunk
+                if any(marker in window for marker in markers):
+                    found = True
+                    break
+                tail = window[-len(max(markers, key=len)):]
+
+        assert found
 
 
 if __name__ == "__main__":
@@ -0,0 +1,84 @@
+"""Tests for the inbound email parser."""
+
+from src.services.email_parser import (
+    ATTACHMENT_CHUNK_SIZE,
+    LARGE_HEADERS_THRESHOLD,
+    PARSERS,
+    EmailParser,
+    parse,
+)
+
+
+class TestParserDispatch:
+    def test_known_providers_registered(self):
+        """Test that every provider maps to its parser."""
+        assert PARSERS["sendgrid"] is EmailParser.parse_sendgrid
+        assert PARSERS["mailgun"] is EmailParser.parse_mailgun
+        assert PARSERS["postmark"] is EmailParser.parse_postmark
+        assert PARSERS["generic"] is EmailParser.parse_generic
+
+    def test_unknown_provider_uses_generic(self):
+        """Test that unknown providers fall back to the generic parser."""
+        parsed = parse("unknown", {"from": "Jane <jane@example.com>", "subject": "Hi"})
+
+        assert parsed.from_email == "jane@example.com"
+        assert parsed.from_name == "Jane"
+        assert parsed.subject == "Hi"
+
+
+class TestAttachments:
+    def test_sendgrid_skips_missing_attachments(self):
+        """Test that missing SendGrid attachment slots are skipped."""
+
+        class Upload:
+            filename = "invoice.pdf"
+            content_type = "application/pdf"
+
+        parsed = EmailParser.parse_sendgrid(
+            {"from": "a@example.com", "attachments": "2", "attachment2": Upload()}
+        )
+
+        assert [a.filename for a in parsed.attachments] == ["invoice.pdf"]
+
+    async def test_sendgrid_attachment_streams_in_chunks(self):
+        """Test that upload content is exposed as a chunked stream."""
+        from io import BytesIO
+
+        from starlette.datastructures import UploadFile
+
+        data = b"x" * (ATTACHMENT_CHUNK_SIZE + 10)
+        upload = UploadFile(BytesIO(data), filename="big.bin", size=len(data))
+
+        parsed = EmailParser.parse_sendgrid(
+            {"from": "a@example.com", "attachments": "1", "attachment1": upload}
+        )
+        attachment = parsed.attachments[0]
+        chunks = [chunk async for chunk in attachment.content_stream()]
+
+        assert attachment.size == len(data)
+        assert [len(c) for c in chunks] == [ATTACHMENT_CHUNK_SIZE, 10]
+
+
+class TestHeaderParsing:
+    HEADERS = (
+        "Message-ID: <abc@mail.example.com>\n"
+        "Subject: hello\n  world\n"
+        "References: <a@example.com>\n\t<b@example.com>\n"
+    )
+
+    def test_small_headers(self):
+        """Test that folded headers are unfolded."""
+        headers = EmailParser._parse_headers(self.HEADERS)
+
+        assert headers["message-id"] == "<abc@mail.example.com>"
+        assert headers["subject"] == "hello world"
+        assert headers["references"] == "<a@example.com> <b@example.com>"
+
+    def test_large_headers_match_small_path(self):
+        """Test that the stdlib path for large blocks gives the same values."""
+        padding = "X-Padding: " + "x" * LARGE_HEADERS_THRESHOLD + "\n"
+        headers = EmailParser._parse_headers(self.HEADERS + padding)
+
+        assert headers["message-id"] == "<abc@mail.example.com>"
+        assert headers["subject"] == "hello world"
+        assert headers["references"] == "<a@example.com> <b@example.com>"
@@ -7,6 +7,9 @@ These tests require the full stack to be running:
 Run with:
     pytest tests/test_load.py -v -s
 
+Under pytest-xdist (--dist loadgroup) these tests run on a single worker,
+alongside the E2E lifecycle test.
+
 For heavier load testing, adjust CONCURRENT_TICKETS and TOTAL_TICKETS.
 """
 
@@ -14,9 +17,13 @@ import asyncio
 import time
 import uuid
 from collections import Counter
+from itertools import islice
 
 import httpx
 import pytest
+import pytest_asyncio
+
+from src.common.serialization import dumps, loads
 
 # Base URL for the API
 BASE_URL = "http://localhost:8000"
@@ -25,7 +32,23 @@ BASE_URL = "http://localhost:8000"
 CONCURRENT_TICKETS = 10  # Number of tickets submitted in parallel
 TOTAL_TICKETS = 20  # Total tickets to process
 PROCESSING_TIMEOUT = 300  # Max time to wait for all tickets (seconds)
-POLL_INTERVAL = 3  # Seconds between status polls
+FIRST_POLL_INTERVAL = 0.1  # Seconds before the first re-poll
+POLL_INTERVAL = 3  # Ceiling for the backed-off interval between polls
+
+# Ticket payloads are serialized up front and posted as raw bytes
+JSON_HEADERS = {"content-type": "application/json"}
+
+
+@pytest_asyncio.fixture(scope="session", loop_scope="session")
+async def async_client():
+    """HTTP client shared by all load tests, so connections stay warm between them."""
+    async with httpx.AsyncClient(
+        base_url=BASE_URL,
+        timeout=60.0,
+        http2=True,
+        limits=httpx.Limits(max_keepalive_connections=50, max_connections=200),
+    ) as client:
+        yield client
 
 
 def generate_ticket_data(index: int) -> dict:
@@ -39,11 +62,12 @@ def generate_ticket_data(index: int) -> dict:
     }
 
 
+@pytest.mark.xdist_group("ticket_processing")
 class TestLoadProcessing:
     """Load tests for concurrent ticket processing."""
 
-    @pytest.mark.asyncio
-    async def test_concurrent_ticket_submission(self):
+    @pytest.mark.asyncio(loop_scope="session")
+    async def test_concurrent_ticket_submission(self, async_client):
         """
         Test submitting multiple tickets concurrently.
 
@@ -55,103 +79,122 @@ class TestLoadProcessing:
         print(f"\n[LOAD] Starting load test: {TOTAL_TICKETS} tickets, "
               f"{CONCURRENT_TICKETS} concurrent")
 
-        async with httpx.AsyncClient(base_url=BASE_URL, timeout=30.0) as client:
-            # Check health first
-            health = await client.get("/health")
-            assert health.status_code == 200
-            assert health.json()["status"] == "healthy"
-            print("[LOAD] System healthy, starting test...")
-
-            # Submit tickets in batches
-            ticket_ids = []
-            start_time = time.time()
-
-            for batch_start in range(0, TOTAL_TICKETS, CONCURRENT_TICKETS):
-                batch_end = min(batch_start + CONCURRENT_TICKETS, TOTAL_TICKETS)
-                batch_size = batch_end - batch_start
-
-                print(f"[LOAD] Submitting batch {batch_start + 1}-{batch_end}...")
-
-                # Create tasks for concurrent submission
-                tasks = []
-                for i in range(batch_start, batch_end):
-                    ticket_data = generate_ticket_data(i)
-                    tasks.append(client.post("/tickets", json=ticket_data))
-
-                # Execute batch concurrently
-                responses = await asyncio.gather(*tasks, return_exceptions=True)
-
-                for resp in responses:
-                    if isinstance(resp, Exception):
-                        print(f"[LOAD] Error: {resp}")
-                        continue
-                    assert resp.status_code == 201, f"Failed: {resp.text}"
-                    ticket_ids.append(resp.json()["ticket_id"])
-
-            submit_time = time.time() - start_time
-            print(f"[LOAD] Submitted {len(ticket_ids)} tickets in {submit_time:.1f}s")
-
-            # Poll all tickets until completion
-            print("[LOAD] Waiting for all tickets to complete...")
-            completed = set()
-            failed = set()
-            poll_start = time.time()
-
-            while len(completed) + len(failed) < len(ticket_ids):
-                if time.time() - poll_start > PROCESSING_TIMEOUT:
-                    pending = set(ticket_ids) - completed - failed
-                    print(f"[LOAD] TIMEOUT! Pending tickets: {len(pending)}")
-                    break
-
-                # Check status of incomplete tickets
-                pending_ids = [
-                    tid for tid in ticket_ids
-                    if tid not in completed and tid not in failed
+        # Check health first
+        health = await async_client.get("/health")
+        assert health.status_code == 200
+        assert health.json()["status"] == "healthy"
+        print("[LOAD] System healthy, starting test...")
+
+        # Submit tickets in batches, with payloads built before timing starts
+        payloads = [dumps(generate_ticket_data(i)) for i in range(TOTAL_TICKETS)]
+        ticket_ids = []
+        start_time = time.time()
+
+        for batch_start in range(0, TOTAL_TICKETS, CONCURRENT_TICKETS):
+            batch_end = min(batch_start + CONCURRENT_TICKETS, TOTAL_TICKETS)
+            batch_size = batch_end - batch_start
+
+            print(f"[LOAD] Submitting batch {batch_start + 1}-{batch_end}...")
+
+            # Submit the batch concurrently; a failed request cancels the
+            # rest of the batch and fails the test
+            async with asyncio.TaskGroup() as tg:
+                tasks = [
+                    tg.create_task(
+                        async_client.post("/tickets", content=payload, headers=JSON_HEADERS)
+                    )
+                    for payload in payloads[batch_start:batch_end]
                 ]
 
-                # Poll in batches to avoid overwhelming the API
-                for tid in pending_ids[:CONCURRENT_TICKETS]:
-                    resp = await client.get(f"/tickets/{tid}")
-                    if resp.status_code == 200:
-                        status = resp.json()["status"]
-                        if status == "completed":
-                            completed.add(tid)
-                        elif status == "failed_permanent":
-                            failed.add(tid)
-
-                progress = len(completed) + len(failed)
-                print(f"[LOAD] Progress: {progress}/{len(ticket_ids)} "
-                      f"(completed: {len(completed)}, failed: {len(failed)})")
-
-                if len(completed) + len(failed) < len(ticket_ids):
-                    await asyncio.sleep(POLL_INTERVAL)
-
-            total_time = time.time() - start_time
-            print(f"\n[LOAD] === RESULTS ===")
-            print(f"[LOAD] Total tickets: {len(ticket_ids)}")
-            print(f"[LOAD] Completed: {len(completed)}")
-            print(f"[LOAD] Failed: {len(failed)}")
-            print(f"[LOAD] Total time: {total_time:.1f}s")
-            print(f"[LOAD] Avg time per ticket: {total_time / len(ticket_ids):.1f}s")
-
-            # Verify no duplicate processing
-            await self._verify_no_duplicates(client, list(completed)[:10])
-
-            # Assert success rate
-            success_rate = len(completed) / len(ticket_ids)
-            print(f"[LOAD] Success rate: {success_rate * 100:.1f}%")
-            assert success_rate >= 0.9, f"Success rate too low: {success_rate}"
+            # tasks[i] is the submission of ticket batch_start + i
+            for task in tasks:
+                resp = task.result()
+                assert resp.status_code == 201, f"Failed: {resp.text}"
+                ticket_ids.append(resp.json()["ticket_id"])
+
+        submit_time = time.time() - start_time
+        print(f"[LOAD] Submitted {len(ticket_ids)} tickets in {submit_time:.1f}s")
+
+        # Poll all tickets until completion
+        print("[LOAD] Waiting for all tickets to complete...")
+        completed = set()
+        failed = set()
+        semaphore = asyncio.Semaphore(CONCURRENT_TICKETS)
+        deadline = time.monotonic() + PROCESSING_TIMEOUT
+        interval = FIRST_POLL_INTERVAL
+
+        while len(completed) + len(failed) < len(ticket_ids):
+            if time.monotonic() > deadline:
+                pending = set(ticket_ids) - completed - failed
+                print(f"[LOAD] TIMEOUT! Pending tickets: {len(pending)}")
+                break
+
+            # Check status of incomplete tickets
+            pending_ids = [
+                tid for tid in ticket_ids
+                if tid not in completed and tid not in failed
+            ]
+
+            # Keep up to CONCURRENT_TICKETS status requests in flight;
+            # each reply frees a slot for the next pending ticket
+            tasks = [
+                asyncio.create_task(self._poll_one(async_client, semaphore, tid))
+                for tid in pending_ids
+            ]
+            for next_done in asyncio.as_completed(tasks):
+                tid, resp = await next_done
+                if resp.status_code == 200:
+                    status = loads(resp.content)["status"]
+                    if status == "completed":
+                        completed.add(tid)
+                    elif status == "failed_permanent":
+                        failed.add(tid)
+
+            progress = len(completed) + len(failed)
+            print(f"[LOAD] Progress: {progress}/{len(ticket_ids)} "
+                  f"(completed: {len(completed)}, failed: {len(failed)})")
+
+            if len(completed) + len(failed) < len(ticket_ids):
+                await asyncio.sleep(interval)
+                interval = min(interval * 1.7, POLL_INTERVAL)
+
+        total_time = time.time() - start_time
+        print(f"\n[LOAD] === RESULTS ===")
+        print(f"[LOAD] Total tickets: {len(ticket_ids)}")
+        print(f"[LOAD] Completed: {len(completed)}")
+        print(f"[LOAD] Failed: {len(failed)}")
+        print(f"[LOAD] Total time: {total_time:.1f}s")
+        print(f"[LOAD] Avg time per ticket: {total_time / len(ticket_ids):.1f}s")
+
+        # Verify no duplicate processing
+        await self._verify_no_duplicates(async_client, list(islice(completed, 10)))
+
+        # Assert success rate
+        success_rate = len(completed) / len(ticket_ids)
+        print(f"[LOAD] Success rate: {success_rate * 100:.1f}%")
+        assert success_rate >= 0.9, f"Success rate too low: {success_rate}"
+
+    async def _poll_one(
+        self, client: httpx.AsyncClient, semaphore: asyncio.Semaphore, tid: str
+    ) -> tuple[str, httpx.Response]:
+        """Fetch one ticket's status, holding a slot in the polling window."""
+        async with semaphore:
+            return tid, await client.get(f"/tickets/{tid}")
 
     async def _verify_no_duplicates(self, client: httpx.AsyncClient, ticket_ids: list):
         """Verify no duplicate processing by checking events."""
         print("[LOAD] Verifying no duplicate processing...")
 
-        for tid in ticket_ids:
-            resp = await client.get(f"/tickets/{tid}/events")
-            if resp.status_code != 200:
+        responses = await asyncio.gather(
+            *(client.get(f"/tickets/{tid}/events") for tid in ticket_ids),
+            return_exceptions=True,
+        )
+
+        for tid, resp in zip(ticket_ids, responses):
+            if isinstance(resp, Exception) or resp.status_code != 200:
                 continue
 
-            events = resp.json()
+            events = loads(resp.content)
             step_events = [e for e in events if e["event_type"] == "step_complete"]
 
             # Count occurrences of each step
@@ -166,11 +209,12 @@ class TestLoadProcessing:
         print("[LOAD] Duplicate check complete")
 
 
+@pytest.mark.xdist_group("ticket_processing")
 class TestBurstLoad:
     """Test system behavior under burst load."""
 
-    @pytest.mark.asyncio
-    async def test_burst_submission(self):
+    @pytest.mark.asyncio(loop_scope="session")
+    async def test_burst_submission(self, async_client):
         """
         Test submitting a burst of tickets all at once.
 
@@ -179,32 +223,35 @@ class TestBurstLoad:
         BURST_SIZE = 15
         print(f"\n[BURST] Submitting {BURST_SIZE} tickets simultaneously...")
 
-        async with httpx.AsyncClient(base_url=BASE_URL, timeout=30.0) as client:
-            # Submit all at once
-            tasks = []
-            for i in range(BURST_SIZE):
-                ticket_data = generate_ticket_data(i + 1000)  # Offset to avoid conflicts
-                tasks.append(client.post("/tickets", json=ticket_data))
-
-            start = time.time()
-            responses = await asyncio.gather(*tasks, return_exceptions=True)
-            elapsed = time.time() - start
-
-            # Count successes
-            successes = sum(
-                1 for r in responses
-                if not isinstance(r, Exception) and r.status_code == 201
-            )
+        # Offset to avoid conflicts
+        payloads = [dumps(generate_ticket_data(i + 1000)) for i in range(BURST_SIZE)]
+
+        # Submit all at once
+        tasks = [
+            async_client.post("/tickets", content=payload, headers=JSON_HEADERS)
+            for payload in payloads
+        ]
+
+        start = time.time()
+        responses = await asyncio.gather(*tasks, return_exceptions=True)
+        elapsed = time.time() - start
 
-            print(f"[BURST] Created {successes}/{BURST_SIZE} tickets in {elapsed:.2f}s")
-            assert successes == BURST_SIZE, f"Only {successes} tickets created"
+        # Count successes
+        successes = sum(
+            1 for r in responses
+            if not isinstance(r, Exception) and r.status_code == 201
+        )
 
+        print(f"[BURST] Created {successes}/{BURST_SIZE} tickets in {elapsed:.2f}s")
+        assert successes == BURST_SIZE, f"Only {successes} tickets created"
 
+
+@pytest.mark.xdist_group("ticket_processing")
 class TestThroughput:
     """Measure system throughput."""
 
-    @pytest.mark.asyncio
-    async def test_measure_throughput(self):
+    @pytest.mark.asyncio(loop_scope="session")
+    async def test_measure_throughput(self, async_client):
         """
         Measure tickets processed per minute.
 
@@ -213,41 +260,48 @@ class TestThroughput:
         SAMPLE_SIZE = 5
         print(f"\n[THROUGHPUT] Measuring with {SAMPLE_SIZE} tickets...")
 
-        async with httpx.AsyncClient(base_url=BASE_URL, timeout=60.0) as client:
-            ticket_ids = []
-
-            # Submit tickets
-            for i in range(SAMPLE_SIZE):
-                ticket_data = generate_ticket_data(i + 2000)
-                resp = await client.post("/tickets", json=ticket_data)
-                if resp.status_code == 201:
-                    ticket_ids.append(resp.json()["ticket_id"])
-
-            if not ticket_ids:
-                pytest.skip("No tickets created")
-
-            # Wait for completion and measure time
-            start = time.time()
-            completed = 0
-
-            while completed < len(ticket_ids) and time.time() - start < 180:
-                for tid in ticket_ids:
-                    resp = await client.get(f"/tickets/{tid}")
-                    if resp.status_code == 200:
-                        if resp.json()["status"] == "completed":
-                            completed += 1
-
-                if completed < len(ticket_ids):
-                    await asyncio.sleep(2)
-
-            elapsed = time.time() - start
-
-            if completed > 0:
-                throughput = (completed / elapsed) * 60  # per minute
-                print(f"[THROUGHPUT] Processed {completed} tickets in {elapsed:.1f}s")
-                print(f"[THROUGHPUT] Throughput: {throughput:.1f} tickets/minute")
-            else:
-                print("[THROUGHPUT] No tickets completed in time")
+        ticket_ids = []
+
+        # Submit tickets
+        for i in range(SAMPLE_SIZE):
+            ticket_data = generate_ticket_data(i + 2000)
+            resp = await async_client.post("/tickets", json=ticket_data)
+            if resp.status_code == 201:
+                ticket_ids.append(resp.json()["ticket_id"])
+
+        if not ticket_ids:
+            pytest.skip("No tickets created")
+
+        # Wait for completion and measure time
+        start = time.monotonic()
+        deadline = start + 180
+        completed: set[str] = set()
+        interval = FIRST_POLL_INTERVAL
+
+        while len(completed) < len(ticket_ids) and time.monotonic() < deadline:
+            # One poll cycle checks every still-pending ticket concurrently,
+            # so a slow response doesn't delay the others and completed
+            # tickets aren't fetched again
+            pending = [tid for tid in ticket_ids if tid not in completed]
+            responses = await asyncio.gather(
+                *(async_client.get(f"/tickets/{tid}") for tid in pending)
+            )
+            for tid, resp in zip(pending, responses):
+                if resp.status_code == 200 and loads(resp.content)["status"] == "completed":
+                    completed.add(tid)
+
+            if len(completed) < len(ticket_ids):
+                await asyncio.sleep(interval)
+                interval = min(interval * 1.7, 2.0)
+
+        elapsed = time.monotonic() - start
+
+        if completed:
+            throughput = (len(completed) / elapsed) * 60  # per minute
+            print(f"[THROUGHPUT] Processed {len(completed)} tickets in {elapsed:.1f}s")
+            print(f"[THROUGHPUT] Throughput: {throughput:.1f} tickets/minute")
+        else:
+            print("[THROUGHPUT] No tickets completed in time")
 
 
 if __name__ == "__main__":
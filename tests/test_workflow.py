@@ -1,29 +1,88 @@
 """Tests for the workflow layer."""
 
 import pytest
-from unittest.mock import patch, MagicMock
+from unittest.mock import AsyncMock, MagicMock, patch
+
+
+@pytest.fixture(scope="module")
+def compiled():
+    """The compiled workflow, built once for the module's graph tests."""
+    from src.workflow.graph import get_compiled_workflow
+
+    return get_compiled_workflow()
 
 
 class TestWorkflowGraph:
-    def test_workflow_has_all_nodes(self):
+    def test_workflow_has_all_nodes(self, compiled):
         """Test that workflow contains all expected nodes."""
-        from src.workflow.graph import create_workflow
+        nodes = set(compiled.get_graph().nodes)
 
-        workflow = create_workflow()
-        graph = workflow.get_graph()
-        nodes = list(graph.nodes.keys())
+        expected_nodes = {"classify", "extract", "research", "draft", "review", "finalize"}
+        missing = expected_nodes - nodes
+        assert not missing, f"Missing nodes: {sorted(missing)}"
 
-        expected_nodes = ["classify", "extract", "research", "draft", "review", "finalize"]
-        for node in expected_nodes:
-            assert node in nodes, f"Missing node: {node}"
+    def test_independent_nodes_fan_out_before_draft(self, compiled):
+        """Test that classify, extract and research run in parallel and join at draft."""
+        graph = compiled.get_graph()
+        sources = {edge.source for edge in graph.edges if edge.target == "draft"}
+        starts = {edge.target for edge in graph.edges if edge.source == "__start__"}
 
-    def test_workflow_compiles(self):
-        """Test that workflow compiles without errors."""
-        from src.workflow.graph import get_compiled_workflow
+        assert sources == {"classify", "extract", "research"}
+        assert starts == {"classify", "extract", "research"}
 
-        compiled = get_compiled_workflow()
+    def test_workflow_compiles(self, compiled):
+        """Test that workflow compiles without errors."""
         assert compiled is not None
 
+    @patch("src.workflow.graph.get_compiled_workflow")
+    async def test_process_tickets_batch_runs_graph_abatch(self, mock_compiled):
+        """Test batch processing maps tickets to states and caps concurrency."""
+        from uuid import uuid4
+
+        from src.workflow.graph import process_tickets_batch
+        from src.workflow.state import TicketInput
+
+        mock_compiled.return_value.abatch = AsyncMock(return_value=[{"final_response": "ok"}])
+        ticket = TicketInput(
+            ticket_id=uuid4(), customer_id="cust1", subject="Cannot login", body="Help"
+        )
+
+        results = await process_tickets_batch([ticket], max_concurrency=4)
+
+        assert results == [{"final_response": "ok"}]
+        states, = mock_compiled.return_value.abatch.call_args.args
+        assert states[0]["ticket_id"] == str(ticket.ticket_id)
+        assert mock_compiled.return_value.abatch.call_args.kwargs["config"] == {
+            "max_concurrency": 4
+        }
+
+    @patch("src.workflow.graph.get_compiled_workflow")
+    async def test_stream_draft_runs_on_shared_loop(self, mock_compiled):
+        """Test the workflow streams on the shared loop and only tokens reach the caller."""
+        import asyncio
+
+        from src.common.event_loop import get_event_loop
+        from src.workflow.graph import stream_draft
+
+        loops = []
+
+        async def astream_events(state, version):
+            loops.append(asyncio.get_running_loop())
+            for node, text in (("classify", "account"), ("draft", "Hi"), ("draft", " there")):
+                yield {
+                    "event": "on_chat_model_stream",
+                    "metadata": {"langgraph_node": node},
+                    "data": {"chunk": MagicMock(content=text)},
+                }
+
+        mock_compiled.return_value.astream_events = astream_events
+
+        tokens = [token async for token in stream_draft({"ticket_id": "t1"})]
+
+        assert tokens == ["Hi", " there"]
+        assert loops == [get_event_loop()]
+        assert get_event_loop() is not asyncio.get_running_loop()
+
 
 class TestVisualization:
     def test_generate_mermaid(self):
@@ -36,6 +95,28 @@ class TestVisualization:
         assert "classify" in mermaid
         assert "finalize" in mermaid
 
+    def test_generate_mermaid_uses_cache(self, tmp_path):
+        """Test a cached diagram is returned without building the graph."""
+        from src.workflow import visualize
+
+        with patch.object(visualize, "_CACHE_DIR", tmp_path):
+            visualize._cache_path(".mmd").write_text("flowchart TD")
+            with patch.object(visualize, "_get_graph") as get_graph:
+                assert visualize.generate_mermaid() == "flowchart TD"
+
+        get_graph.assert_not_called()
+
+    def test_ascii_path_skips_graph_import(self):
+        """Test importing visualize for the ASCII diagram doesn't load the graph."""
+        import subprocess
+        import sys
+
+        code = (
+            "import sys; from src.workflow.visualize import generate_ascii; generate_ascii(); "
+            "assert 'src.workflow.graph' not in sys.modules and 'langgraph' not in sys.modules"
+        )
+        subprocess.run([sys.executable, "-c", code], check=True)
+
     def test_generate_ascii(self):
         """Test ASCII diagram generation."""
         from src.workflow.visualize import generate_ascii
@@ -50,14 +131,38 @@ class TestVisualization:
         assert "finalize" in ascii_diagram
 
 
+@pytest.fixture
+def mock_classify_llm(monkeypatch):
+    """The classify node's chat model, replaced for one test."""
+    mock = MagicMock()
+    monkeypatch.setattr("src.workflow.nodes.classify_llm", mock)
+    return mock
+
+
+@pytest.fixture
+def mock_embeddings(monkeypatch):
+    """The classify node's embedding model, replaced for one test."""
+    mock = MagicMock()
+    monkeypatch.setattr("src.workflow.nodes.embeddings", mock)
+    return mock
+
+
+@pytest.fixture
+def mock_extractor(monkeypatch):
+    """The extract node's structured-output model, replaced for one test."""
+    mock = MagicMock()
+    monkeypatch.setattr("src.workflow.nodes.entity_extractor", mock)
+    return mock
+
+
 class TestWorkflowNodes:
-    @patch("src.workflow.nodes.llm")
-    def test_classify_node_returns_classification(self, mock_llm):
+    async def test_classify_node_returns_classification(self, mock_classify_llm, mock_embeddings):
         """Test classify node returns valid classification."""
         from src.workflow.nodes import classify_node
         from src.workflow.state import WorkflowState
 
-        mock_llm.invoke.return_value = MagicMock(content="account")
+        mock_classify_llm.ainvoke = AsyncMock(return_value=MagicMock(content="account"))
+        mock_embeddings.aembed_query = AsyncMock(side_effect=RuntimeError("offline"))
 
         state = WorkflowState(
             ticket_id="test-123",
@@ -66,19 +171,123 @@ class TestWorkflowNodes:
             body="I forgot my password",
         )
 
-        result = classify_node(state)
+        result = await classify_node(state)
 
         assert "classification" in result
         assert result["classification"] in ["billing", "technical", "account", "general"]
 
-    @patch("src.workflow.nodes.llm")
-    def test_extract_node_returns_entities(self, mock_llm):
+    @patch("src.workflow.nodes._category_vectors", None)
+    @patch("src.workflow.nodes.classification_cache")
+    async def test_classify_node_zero_shot_skips_llm(
+        self, mock_cache, mock_classify_llm, mock_embeddings
+    ):
+        """Test a ticket close to a category description is classified without the LLM."""
+        from src.workflow.nodes import classify_node
+        from src.workflow.state import WorkflowState
+
+        mock_classify_llm.ainvoke = AsyncMock()
+        mock_cache.lookup.return_value = None
+        mock_embeddings.aembed_query = AsyncMock(return_value=[0.0, 0.0, 1.0, 0.0])
+        # One-hot description vectors in billing, technical, account, general order
+        mock_embeddings.aembed_documents = AsyncMock(
+            return_value=[[1.0, 0, 0, 0], [0, 1.0, 0, 0], [0, 0, 1.0, 0], [0, 0, 0, 1.0]]
+        )
+
+        state = WorkflowState(
+            ticket_id="test-123",
+            customer_id="cust1",
+            subject="Cannot login",
+            body="I forgot my password",
+        )
+
+        result = await classify_node(state)
+
+        assert result["classification"] == "account"
+        mock_classify_llm.ainvoke.assert_not_called()
+
+    @patch("src.workflow.nodes._category_vectors", None)
+    @patch("src.workflow.nodes.classification_cache")
+    async def test_classify_node_zero_shot_near_tie_uses_llm(
+        self, mock_cache, mock_classify_llm, mock_embeddings
+    ):
+        """Test a ticket equally close to two categories falls through to the LLM."""
+        from src.workflow.nodes import classify_node
+        from src.workflow.state import WorkflowState
+
+        mock_classify_llm.ainvoke = AsyncMock(return_value=MagicMock(content="billing"))
+        mock_cache.lookup.return_value = None
+        # Halfway between billing and account: a high score but no clear winner
+        mock_embeddings.aembed_query = AsyncMock(return_value=[1.0, 0.0, 1.0, 0.0])
+        mock_embeddings.aembed_documents = AsyncMock(
+            return_value=[[1.0, 0, 0, 0], [0, 1.0, 0, 0], [0, 0, 1.0, 0], [0, 0, 0, 1.0]]
+        )
+
+        state = WorkflowState(
+            ticket_id="test-123",
+            customer_id="cust1",
+            subject="Refund after password reset",
+            body="I was charged after resetting my password",
+        )
+
+        result = await classify_node(state)
+
+        assert result["classification"] == "billing"
+        mock_classify_llm.ainvoke.assert_awaited_once()
+
+    @patch("src.workflow.nodes.classification_cache")
+    async def test_classify_node_does_not_cache_fallback_label(
+        self, mock_cache, mock_classify_llm, mock_embeddings
+    ):
+        """Test an invalid LLM answer falls back to general without caching it."""
+        from src.workflow.nodes import classify_node
+        from src.workflow.state import WorkflowState
+
+        mock_classify_llm.ainvoke = AsyncMock(return_value=MagicMock(content="I'm not sure"))
+        mock_cache.lookup.return_value = None
+        mock_embeddings.aembed_query = AsyncMock(return_value=[0.5, 0.5, 0.5, 0.5])
+        # Identical description vectors tie, so zero-shot defers to the LLM
+        mock_embeddings.aembed_documents = AsyncMock(return_value=[[1.0, 1.0, 1.0, 1.0]] * 4)
+
+        state = WorkflowState(
+            ticket_id="test-123",
+            customer_id="cust1",
+            subject="Hmm",
+            body="Something is off",
+        )
+
+        with patch("src.workflow.nodes._category_vectors", None):
+            result = await classify_node(state)
+
+        assert result["classification"] == "general"
+        mock_cache.add.assert_not_called()
+
+    @patch("src.workflow.nodes._category_vectors", None)
+    async def test_zero_shot_embeds_descriptions_once(self, mock_embeddings):
+        """Test concurrent first calls share one embedding of the descriptions."""
+        import asyncio
+
+        from src.workflow.nodes import _zero_shot_classify
+
+        async def slow_embed(descriptions):
+            await asyncio.sleep(0.01)
+            return [[1.0, 0, 0, 0], [0, 1.0, 0, 0], [0, 0, 1.0, 0], [0, 0, 0, 1.0]]
+
+        mock_embeddings.aembed_documents = AsyncMock(side_effect=slow_embed)
+
+        results = await asyncio.gather(
+            *(_zero_shot_classify([0.0, 1.0, 0.0, 0.0]) for _ in range(5))
+        )
+
+        assert {label for label, _, _ in results} == {"technical"}
+        mock_embeddings.aembed_documents.assert_awaited_once()
+
+    async def test_extract_node_returns_entities(self, mock_extractor):
         """Test extract node returns entities dict."""
         from src.workflow.nodes import extract_node
-        from src.workflow.state import WorkflowState
+        from src.workflow.state import ExtractedEntities, WorkflowState
 
-        mock_llm.invoke.return_value = MagicMock(
-            content='{"order_id": null, "product": null, "issue_type": "login", "urgency": "medium"}'
+        mock_extractor.ainvoke = AsyncMock(
+            return_value=ExtractedEntities(issue_type="login", urgency="medium")
         )
 
         state = WorkflowState(
@@ -88,7 +297,461 @@ class TestWorkflowNodes:
             body="I forgot my password",
         )
 
-        result = extract_node(state)
+        result = await extract_node(state)
 
         assert "entities" in result
         assert isinstance(result["entities"], dict)
+        assert result["entities"]["urgency"] == "medium"
+
+    async def test_extract_node_falls_back_to_defaults(self, mock_extractor):
+        """Test a failed extraction yields default entities instead of failing the ticket."""
+        from src.workflow.nodes import extract_node
+        from src.workflow.state import WorkflowState
+
+        mock_extractor.ainvoke = AsyncMock(side_effect=ValueError("invalid structured output"))
+
+        state = WorkflowState(
+            ticket_id="test-123",
+            customer_id="cust1",
+            subject="Cannot login",
+            body="I forgot my password",
+        )
+
+        result = await extract_node(state)
+
+        assert result["entities"] == {
+            "order_id": None,
+            "product": None,
+            "issue_type": "unknown",
+            "urgency": "medium",
+        }
+
+    @patch("src.workflow.nodes.llm")
+    async def test_draft_node_joins_streamed_chunks(self, mock_llm):
+        """Test draft node assembles the streamed tokens into the draft."""
+        from src.workflow.nodes import draft_node
+        from src.workflow.state import WorkflowState
+
+        async def astream(prompt):
+            for token in ["Hi there, ", "try resetting ", "your password."]:
+                yield MagicMock(content=token)
+
+        mock_llm.astream = astream
+
+        state = WorkflowState(
+            ticket_id="test-123",
+            customer_id="cust1",
+            subject="Cannot login",
+            body="I forgot my password",
+            classification="account",
+        )
+
+        result = await draft_node(state)
+
+        assert result["draft_response"] == "Hi there, try resetting your password."
+
+    @patch("src.workflow.nodes.review_assessor")
+    async def test_review_node_keeps_revision_only_when_rejected(self, mock_assessor):
+        """Test review node returns the revised response for a rejected draft."""
+        from src.workflow.nodes import review_node
+        from src.workflow.state import ReviewResult, WorkflowState
+
+        mock_assessor.ainvoke = AsyncMock(
+            return_value=ReviewResult(
+                approved=False, notes="Promises a refund.", revised="We'll look into it."
+            )
+        )
+
+        state = WorkflowState(
+            ticket_id="test-123",
+            customer_id="cust1",
+            subject="Refund",
+            body="I want my money back",
+            draft_response="You'll get a full refund today.",
+        )
+
+        result = await review_node(state)
+
+        assert result["review_approved"] is False
+        assert result["revised_response"] == "We'll look into it."
+
+    async def test_finalize_node_prefers_revision(self):
+        """Test finalize sends the revision when there is one, else the draft."""
+        from src.workflow.nodes import finalize_node
+        from src.workflow.state import WorkflowState
+
+        base = {
+            "ticket_id": "test-123",
+            "customer_id": "cust1",
+            "subject": "Refund",
+            "body": "I want my money back",
+            "draft_response": "Draft",
+        }
+
+        revised = await finalize_node(WorkflowState(**base, revised_response="Revised"))
+        approved = await finalize_node(WorkflowState(**base))
+
+        assert revised["final_response"] == "Revised"
+        assert approved["final_response"] == "Draft"
+
+
+class TestSemanticCache:
+    def test_similar_vector_hits(self):
+        """Test a near-duplicate embedding returns the cached label."""
+        from src.workflow.semantic_cache import SemanticCache
+
+        cache = SemanticCache(threshold=0.9)
+        cache.add([1.0, 0.0, 0.1], "account")
+
+        assert cache.lookup([0.9, 0.0, 0.1]) == "account"
+
+    def test_dissimilar_vector_misses(self):
+        """Test an unrelated embedding falls through to the LLM."""
+        from src.workflow.semantic_cache import SemanticCache
+
+        cache = SemanticCache(threshold=0.9)
+        cache.add([1.0, 0.0, 0.0], "account")
+
+        assert cache.lookup([0.0, 1.0, 0.0]) is None
+
+    def test_save_and_load_round_trip(self, tmp_path):
+        """Test entries survive a save/load cycle."""
+        from src.workflow.semantic_cache import SemanticCache
+
+        path = tmp_path / "classify_cache.json"
+        cache = SemanticCache(threshold=0.9)
+        cache.add([0.0, 1.0], "billing")
+        cache.save(path)
+
+        restored = SemanticCache(threshold=0.9)
+        restored.load(path)
+
+        assert restored.lookup([0.0, 2.0]) == "billing"
+
+
+class TestAgentFastPath:
+    @patch("src.workflow.agent.check_order_status")
+    async def test_order_status_answered_without_agent(self, mock_tool):
+        """Test a single-order status question is answered from the tool result."""
+        from src.workflow.agent import fast_path
+
+        mock_tool.name = "check_order_status"
+        mock_tool.ainvoke = AsyncMock(return_value={
+            "success": True,
+            "order": {
+                "status": "shipped",
+                "tracking_number": "1Z999",
+                "carrier": "UPS",
+                "customer": {"id": "cust1", "email": "jane@example.com"},
+            },
+        })
+
+        result = await fast_path("Where is my order?", "Order ord_12345 hasn't arrived", "cust1")
+
+        mock_tool.ainvoke.assert_awaited_once_with({"order_id": "ord_12345"})
+        assert "shipped" in result["final_response"]
+        assert "1Z999" in result["final_response"]
+        assert result["actions_taken"] == [
+            {"tool": "check_order_status", "args": {"order_id": "ord_12345"}}
+        ]
+        assert result["pending_approval"] is None
+
+    @patch("src.workflow.agent.check_order_status")
+    async def test_other_customers_order_falls_through(self, mock_tool):
+        """Test an order belonging to someone else is never summarized on the fast path."""
+        from src.workflow.agent import fast_path
+
+        mock_tool.ainvoke = AsyncMock(return_value={
+            "success": True,
+            "order": {
+                "status": "shipped",
+                "tracking_number": "1Z999",
+                "customer": {"id": "cust_other", "email": "other@example.com"},
+            },
+        })
+
+        assert await fast_path("Where is my order?", "Status of ord_12345?", "cust1") is None
+        assert await fast_path(
+            "Where is my order?", "Status of ord_12345?", "jane@example.com"
+        ) is None
+
+    @patch("src.workflow.agent.reset_password")
+    async def test_password_reset_uses_customer_email(self, mock_tool):
+        """Test a password reset request sends the reset to the customer's email."""
+        from src.workflow.agent import fast_path
+
+        mock_tool.name = "reset_password"
+        mock_tool.ainvoke = AsyncMock(return_value={"success": True, "expires_in": "24 hours"})
+
+        result = await fast_path("Help", "I forgot my password", "jane@example.com")
+
+        mock_tool.ainvoke.assert_awaited_once_with({"user_email": "jane@example.com"})
+        assert "jane@example.com" in result["final_response"]
+
+    @patch("src.workflow.agent.reset_password")
+    async def test_password_reset_to_other_address_falls_through(self, mock_tool):
+        """Test a reset naming an address other than the customer's goes to the agent."""
+        from src.workflow.agent import fast_path
+
+        mock_tool.ainvoke = AsyncMock()
+
+        result = await fast_path(
+            "Help", "I forgot my password, send it to attacker@example.com", "jane@example.com"
+        )
+
+        assert result is None
+        assert await fast_path("Help", "I forgot my password", "cust_jane") is None
+        mock_tool.ainvoke.assert_not_awaited()
+
+    @patch("src.workflow.agent.check_order_status")
+    async def test_refund_request_falls_through(self, mock_tool):
+        """Test tickets needing judgement go to the agent."""
+        from src.workflow.agent import fast_path
+
+        mock_tool.ainvoke = AsyncMock()
+
+        assert await fast_path("Refund", "Where is my refund for ord_12345?", "cust1") is None
+        assert await fast_path("Question", "Do you ship to Canada?", "cust1") is None
+        mock_tool.ainvoke.assert_not_awaited()
+
+
+class TestAgentToolExecution:
+    async def test_safe_calls_run_concurrently_and_keep_order(self):
+        """Test read-only calls are gathered while unsafe ones run alone."""
+        import asyncio
+
+        from langchain_core.messages import ToolMessage
+
+        from src.workflow.agent import execute_tool_calls
+
+        running = 0
+        peak: dict[str, int] = {}
+
+        def fake_tool(name):
+            async def ainvoke(call):
+                nonlocal running
+                running += 1
+                peak[call["id"]] = running
+                await asyncio.sleep(0.01)
+                peak[call["id"]] = max(peak[call["id"]], running)
+                running -= 1
+                return ToolMessage(content=name, tool_call_id=call["id"])
+
+            return MagicMock(ainvoke=ainvoke)
+
+        names = ["check_order_status", "get_customer_history", "reset_password"]
+        calls = [
+            {"name": "check_order_status", "args": {}, "id": "1"},
+            {"name": "get_customer_history", "args": {}, "id": "2"},
+            {"name": "reset_password", "args": {}, "id": "3"},
+            {"name": "unknown_tool", "args": {}, "id": "4"},
+        ]
+
+        with patch("src.workflow.agent.TOOLS_BY_NAME", {n: fake_tool(n) for n in names}):
+            results = await execute_tool_calls(calls)
+
+        assert [m.tool_call_id for m in results] == ["1", "2", "3", "4"]
+        assert peak == {"1": 2, "2": 2, "3": 1}
+        assert results[3].status == "error"
+
+
+class TestToolCaches:
+    async def test_repeat_help_article_query_skips_database(self):
+        """Test a normalized repeat of a help article query is served from cache."""
+        from src.workflow import tools
+
+        execute = AsyncMock(
+            return_value=MagicMock(
+                data=[{"title": "Reset", "content": "Use the link", "category": "account"}]
+            )
+        )
+        client = MagicMock()
+        client.rpc.return_value.execute = execute
+
+        with patch.object(tools, "_help_cache", tools.TTLCache(maxsize=8, ttl=60)), patch(
+            "src.workflow.tools.get_async_supabase_client", return_value=client
+        ):
+            first = await tools.query_help_articles.ainvoke(
+                {"category": "account", "search_term": "Password "}
+            )
+            second = await tools.query_help_articles.ainvoke(
+                {"category": "account", "search_term": "password"}
+            )
+
+        assert first["count"] == 1
+        assert second == first
+        execute.assert_awaited_once()
+        client.rpc.assert_called_once_with(
+            "search_help_articles",
+            {"p_query": "Password ", "p_category": "account", "p_limit": 5},
+        )
+
+    async def test_concurrent_product_lookups_share_one_query(self):
+        """Test identical in-flight product lookups are coalesced into one query."""
+        import asyncio
+
+        from src.workflow import tools
+
+        async def slow_execute():
+            await asyncio.sleep(0.01)
+            return MagicMock(data=[{"id": "prod_1", "name": "Mug", "price": "5.00"}])
+
+        execute = AsyncMock(side_effect=slow_execute)
+        client = MagicMock()
+        client.table.return_value.select.return_value.eq.return_value.limit.return_value.execute = execute
+
+        with patch.object(tools, "_product_cache", tools.LFUCache(maxsize=8)), patch(
+            "src.workflow.tools.get_async_supabase_client", return_value=client
+        ):
+            results = await asyncio.gather(
+                *(tools.lookup_product.ainvoke({"product_id": "prod_1"}) for _ in range(3))
+            )
+
+        assert all(r["products"][0]["id"] == "prod_1" for r in results)
+        execute.assert_awaited_once()
+
+    async def test_check_order_status_embeds_items(self):
+        """Test order items come from the embedded select, in one request."""
+        from src.workflow import tools
+
+        order = {
+            "id": "ord_1",
+            "status": "shipped",
+            "total": "20.00",
+            "created_at": "2024-01-01T00:00:00Z",
+            "customers": {"id": "cust1"},
+            "order_items": [
+                {"product_name": "Mug", "quantity": 2, "unit_price": "10.00", "subtotal": "20.00"}
+            ],
+        }
+        client = MagicMock()
+        query = client.table.return_value.select.return_value.eq.return_value
+        query.maybe_single.return_value.execute = AsyncMock(return_value=MagicMock(data=order))
+
+        with patch("src.workflow.tools.get_async_supabase_client", return_value=client):
+            result = await tools.check_order_status.ainvoke({"order_id": "ord_1"})
+
+        client.table.assert_called_once_with("orders")
+        assert result["order"]["items"] == [
+            {"name": "Mug", "quantity": 2, "price": 10.0, "subtotal": 20.0}
+        ]
+
+    async def test_customer_history_looks_up_by_single_column(self):
+        """Test the customer identifier's shape picks the bundle lookup column."""
+        from src.workflow import tools
+
+        client = MagicMock()
+        client.rpc.return_value.execute = AsyncMock(return_value=MagicMock(data={}))
+
+        with patch("src.workflow.tools.get_async_supabase_client", return_value=client):
+            for customer_id, lookup in [
+                ("cust_john_doe", "id"),
+                ("john@example.com", "email"),
+                ("12345", None),
+            ]:
+                await tools.get_customer_history.ainvoke({"customer_id": customer_id})
+                client.rpc.assert_called_with(
+                    "get_customer_bundle",
+                    {"p_id": customer_id, "p_lookup": lookup, "p_before": None},
+                )
+
+    async def test_customer_history_returns_next_cursor(self):
+        """Test a full page of history yields a cursor to resume from."""
+        from src.workflow import tools
+
+        tickets = [
+            {"id": f"t{i}", "subject": "s", "status": "completed", "created_at": f"2024-01-0{9 - i}"}
+            for i in range(5)
+        ]
+        orders = [{"id": "o1", "status": "shipped", "total": "5.00", "created_at": "2024-01-02"}]
+        client = MagicMock()
+        client.rpc.return_value.execute = AsyncMock(
+            return_value=MagicMock(data={"customer": None, "tickets": tickets, "orders": orders})
+        )
+
+        with patch("src.workflow.tools.get_async_supabase_client", return_value=client):
+            result = await tools.get_customer_history.ainvoke(
+                {"customer_id": "cust_1", "cursor": "2024-02-01"}
+            )
+
+        assert result["next_cursor"] == "2024-01-05"
+        assert client.rpc.call_args.args[1]["p_before"] == "2024-02-01"
+
+
+class TestKnowledgeBase:
+    async def test_search_ranks_help_articles_by_ticket_words(self):
+        """Test the ticket's words are ORed into the ranked help article search."""
+        from src.workflow import tools
+
+        client = MagicMock()
+        client.rpc.return_value.execute = AsyncMock(return_value=MagicMock(data=[
+            {"title": "Resetting your password", "content": "Use the link", "rank": 0.4},
+        ]))
+
+        with patch("src.workflow.tools.get_async_supabase_client", return_value=client):
+            results = await tools.search_knowledge_base("Cannot login: reset my password")
+
+        assert results == [
+            {"title": "Resetting your password", "content": "Use the link", "relevance": 0.4}
+        ]
+        params = client.rpc.call_args.args[1]
+        assert params["p_query"] == "cannot or login or reset or password"
+
+    async def test_search_failure_returns_no_articles(self):
+        """Test a failed search yields nothing rather than placeholder articles."""
+        from src.workflow import tools
+
+        with patch(
+            "src.workflow.tools.get_async_supabase_client", side_effect=RuntimeError("down")
+        ):
+            assert await tools.search_knowledge_base("Where is my refund?") == []
+
+
+class TestBugReport:
+    async def test_github_issue_filed_in_background(self):
+        """Test create_bug_report returns its bug ID without waiting on GitHub."""
+        import asyncio
+
+        from src.workflow import tools
+
+        filed = asyncio.Event()
+
+        async def fake_file(bug_id, title, description, priority):
+            filed.set()
+
+        with patch.object(tools, "_file_github_issue", side_effect=fake_file) as file_issue:
+            result = await tools.create_bug_report.ainvoke(
+                {"title": "Crash", "description": "App crashes on login"}
+            )
+            assert not filed.is_set()
+            await asyncio.wait_for(filed.wait(), timeout=1)
+
+        assert result["bug_id"].startswith("BUG-")
+        file_issue.assert_called_once_with(result["bug_id"], "Crash", "App crashes on login", "medium")
+
+    async def test_drain_waits_for_background_tasks_up_to_timeout(self):
+        """Test shutdown drain lets quick tasks finish and abandons slow ones."""
+        import asyncio
+
+        from src.workflow import tools
+
+        quick = asyncio.create_task(asyncio.sleep(0.01))
+        slow = asyncio.create_task(asyncio.sleep(10))
+
+        with patch.object(tools, "_background_tasks", {quick, slow}):
+            await tools.drain_background_tasks(timeout=0.1)
+
+        assert quick.done()
+        assert not slow.done()
+        slow.cancel()
+
+
+class TestResetPassword:
+    @pytest.mark.parametrize("email", ["", "a@", "@example.com", "a b@example.com", "a@example"])
+    async def test_rejects_malformed_email(self, email):
+        """Test reset_password rejects addresses that aren't user@domain.tld."""
+        from src.workflow.tools import reset_password
+
+        result = await reset_password.ainvoke({"user_email": email})
+
+        assert result["success"] is False